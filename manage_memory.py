@@ -12,6 +12,8 @@ from datetime import datetime
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+# LLMClient's tools import services.* (which live under src/)
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src"))
 
 from src.shared.llm_client import LLMClient
 
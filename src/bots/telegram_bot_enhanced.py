@@ -22,9 +22,11 @@ def create_enhanced_bot():
         handle_start, handle_digest, handle_compose, handle_status, handle_message
     )
     from interfaces.telegram.views.handlers import on_callback
+    from services.email.email_repo import EmailRepo
     
     # Build the application
     app = ApplicationBuilder().token(os.getenv("TELEGRAM_BOT_TOKEN")).build()
+    app.bot_data["email_repo"] = EmailRepo()
     
     # Command handlers
     app.add_handler(CommandHandler("start", handle_start))
@@ -5,9 +5,14 @@ other services (email, chat, etc.) can use the same interface.
 """
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
+from itertools import islice
 from typing import Optional
 
+# A run of text between periods that has something besides whitespace in it
+_SENTENCE_RE = re.compile(r"[^.]*[^.\s][^.]*")
+
 
 @dataclass
 class LLMClient:
@@ -33,8 +38,9 @@ class LLMClient:
         ``max_sentences`` sentences. It acts as a lightweight summary
         function that mimics an LLM call but keeps unit tests simple.
         """
-        sentences = [s.strip() for s in text.split('.') if s.strip()]
-        summary = '. '.join(sentences[:max_sentences])
+        # finditer scans lazily, so only the first max_sentences are ever matched
+        sentences = [m.group().strip() for m in islice(_SENTENCE_RE.finditer(text), max_sentences)]
+        summary = '. '.join(sentences)
         if summary and not summary.endswith('.'):
             summary += '.'
         return summary
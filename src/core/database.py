@@ -2,29 +2,57 @@
 from __future__ import annotations
 
 import os
+from functools import lru_cache
 import psycopg
-from typing import Any
+from typing import Any, ContextManager
 
+# psycopg_pool is optional; without it every get_conn() opens a fresh connection
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    ConnectionPool = None
 
-def get_conn() -> psycopg.Connection[Any]:
-    """Return a new database connection.
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "10"))
 
-    The connection parameters are read from the ``DATABASE_URL`` environment
-    variable. This helper centralizes access so modules can share the same
-    configuration without repeating boilerplate.
-    """
+
+def _dsn() -> str:
+    """Connection string from ``DATABASE_URL`` or the individual POSTGRES_* variables."""
     dsn = os.environ.get("DATABASE_URL")
     if not dsn:
         # Fallback to constructing from individual env vars if DATABASE_URL not set
         host = os.environ.get("POSTGRES_HOST", "localhost")
-        port = os.environ.get("POSTGRES_PORT", "5432") 
+        port = os.environ.get("POSTGRES_PORT", "5432")
         user = os.environ.get("POSTGRES_USER", "postgres")
         database = os.environ.get("POSTGRES_DATABASE", "pa_v2_postgres_db")
         password = os.environ.get("POSTGRES_PASSWORD", "")
-        
+
         if password:
             dsn = f"postgresql://{user}:{password}@{host}:{port}/{database}"
         else:
             dsn = f"postgresql://{user}@{host}:{port}/{database}"
-    
-    return psycopg.connect(dsn)
+    return dsn
+
+
+@lru_cache(maxsize=1)
+def _pool() -> "ConnectionPool":
+    """Process-wide pool, opened on first use."""
+    return ConnectionPool(_dsn(), min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE, open=True)
+
+
+def get_conn() -> ContextManager[psycopg.Connection[Any]]:
+    """Return a database connection for use in a ``with`` block.
+
+    The connection parameters are read from the ``DATABASE_URL`` environment
+    variable. This helper centralizes access so modules can share the same
+    configuration without repeating boilerplate.
+
+    With psycopg_pool installed the connection is borrowed from a shared pool
+    (committed or rolled back and handed back on exit), so callers skip the
+    connect/auth handshake and psycopg's automatic statement preparation
+    carries over between calls. Otherwise a new connection is opened and
+    closed on exit; either way ``with get_conn() as conn`` behaves the same.
+    """
+    if ConnectionPool is None:
+        return psycopg.connect(_dsn())
+    return _pool().connection()
@@ -0,0 +1,51 @@
+"""
+Update processor that keeps each chat's updates in order while different
+chats are handled concurrently.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Any, Awaitable, Dict
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """Process updates from the same chat one at a time, in arrival order.
+
+    With plain ``concurrent_updates(True)`` a slow handler (Graph reply, LLM
+    call) no longer blocks other chats, but two quick messages in one chat
+    can be handled out of order (e.g. a compose step before the previous
+    one finished). Here each chat gets a FIFO lock, so chat A's slow reply
+    only delays chat A.
+    """
+
+    def __init__(self, max_concurrent_updates: int = 256):
+        super().__init__(max_concurrent_updates)
+        self._locks: Dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._users: Dict[int, int] = defaultdict(int)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            # Inline queries, polls etc. have no chat to order against
+            await coroutine
+            return
+
+        key = chat.id
+        self._users[key] += 1
+        try:
+            async with self._locks[key]:
+                await coroutine
+        finally:
+            # Drop the lock again once nobody holds or waits on it
+            self._users[key] -= 1
+            if not self._users[key]:
+                del self._users[key]
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -5,29 +5,38 @@ These functions are designed to work without user interaction.
 
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append(os.path.dirname(__file__))
 
 from services.email.integration import get_latest_emails, send_email
-from services.email.providers.gmail_provider import GmailProvider
-from services.email.providers.outlook_provider import OutlookGraphProvider
+
+def _gmail_provider_cls():
+    # Imported on first use: the Google client stack is slow to import
+    from services.email.providers.gmail_provider import GmailProvider
+    return GmailProvider
+
+def _outlook_provider_cls():
+    from services.email.providers.outlook_provider import OutlookGraphProvider
+    return OutlookGraphProvider
+
+def _probe_auth(get_provider_cls):
+    """Return (authenticated, error message or None) for one provider"""
+    try:
+        return get_provider_cls()().is_authenticated(), None
+    except Exception as e:
+        return False, str(e)
 
 def check_email_auth_status():
     """Check authentication status for both providers"""
     status = {}
     
-    try:
-        gmail = GmailProvider()
-        status['gmail'] = gmail.is_authenticated()
-    except Exception as e:
-        status['gmail'] = False
-        status['gmail_error'] = str(e)
-    
-    try:
-        outlook = OutlookGraphProvider()
-        status['outlook'] = outlook.is_authenticated()
-    except Exception as e:
-        status['outlook'] = False
-        status['outlook_error'] = str(e)
+    # The two probes are independent network/disk checks; run them concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = executor.map(_probe_auth, (_gmail_provider_cls, _outlook_provider_cls))
+        for name, (ok, error) in zip(('gmail', 'outlook'), results):
+            status[name] = ok
+            if error is not None:
+                status[f'{name}_error'] = error
     
     return status
 
@@ -4,7 +4,12 @@ Integrates with existing email system and digest functionality
 """
 import os
 import sys
+import asyncio
+import atexit
+import logging
+import logging.handlers
 import pathlib
+import queue
 
 # Add project root to path
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
@@ -26,12 +31,14 @@ load_dotenv('/etc/pa_v2/secrets.env')
 # Import existing functionality
 from interfaces.telegram.views.digest import send_digest
 from interfaces.telegram.views.handlers import on_callback
+from interfaces.telegram.per_chat import PerChatUpdateProcessor
 from services.email.email_repo import EmailRepo
 from shared.llm_client import LLMClient
 
     # Import new compose functionality
 try:
     from interfaces.telegram.views.compose_handlers import (
+        ComposeState,
         start_compose, 
         handle_compose_callback, 
         handle_compose_message
@@ -57,6 +64,12 @@ except ImportError as e:
 
 TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+# Webhook mode (set TELEGRAM_WEBHOOK_URL) avoids getUpdates polling latency;
+# it needs the python-telegram-bot[webhooks] extra. Unset -> long polling.
+WEBHOOK_URL = os.getenv('TELEGRAM_WEBHOOK_URL')
+WEBHOOK_LISTEN = os.getenv('TELEGRAM_WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('TELEGRAM_WEBHOOK_PORT', '8443'))
+WEBHOOK_SECRET = os.getenv('TELEGRAM_WEBHOOK_SECRET')
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -79,21 +92,22 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text("❌ Email providers not configured")
         return
     
+    def probe(provider_cls):
+        return provider_cls().is_authenticated()
+
+    # Probe both providers concurrently; each may hit disk and a token refresh
+    gmail_ok, outlook_ok = await asyncio.gather(
+        asyncio.to_thread(probe, GmailProvider),
+        asyncio.to_thread(probe, OutlookGraphProvider),
+        return_exceptions=True,
+    )
+
     status_text = "📊 *Email Provider Status:*\n\n"
-    
-    try:
-        gmail = GmailProvider()
-        gmail_status = "✅ Ready" if gmail.is_authenticated() else "❌ Setup needed"
-        status_text += f"🟥 Gmail: {gmail_status}\n"
-    except Exception as e:
-        status_text += f"🟥 Gmail: ❌ Error ({e})\n"
-    
-    try:
-        outlook = OutlookGraphProvider()
-        outlook_status = "✅ Ready" if outlook.is_authenticated() else "❌ Setup needed"
-        status_text += f"🟦 Outlook: {outlook_status}\n"
-    except Exception as e:
-        status_text += f"🟦 Outlook: ❌ Error ({e})\n"
+    for label, ok in (("🟥 Gmail", gmail_ok), ("🟦 Outlook", outlook_ok)):
+        if isinstance(ok, Exception):
+            status_text += f"{label}: ❌ Error ({ok})\n"
+        else:
+            status_text += f"{label}: {'✅ Ready' if ok else '❌ Setup needed'}\n"
     
     await update.message.reply_text(status_text, parse_mode="Markdown")
 
@@ -101,7 +115,7 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 async def digest_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show recent email digest."""
     try:
-        repo = EmailRepo()
+        repo = context.bot_data["email_repo"]
         rows = repo.latest_new_messages(limit=10)
         
         if not rows:
@@ -110,7 +124,12 @@ async def digest_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         
         bot = context.bot
         chat_id = update.effective_chat.id
-        send_digest(bot, chat_id, rows)
+        # build_digest takes (email_id, provider, from_display, from_email, subject, snippet, received_at)
+        await send_digest(bot, chat_id, [
+            (r["id"], r["provider"], r["from_display"], r["from_email"],
+             r["subject"], r["snippet"], r["received_at"])
+            for r in rows
+        ])
         
     except Exception as e:
         await update.message.reply_text(f"❌ Error fetching digest: {e}")
@@ -126,7 +145,7 @@ async def compose_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text("❌ Compose functionality not available")
         return
     
-    start_compose(update, context)
+    await start_compose(update, context)
 
 
 async def setup_bot_data(application: Application) -> None:
@@ -152,7 +171,7 @@ async def setup_bot_data(application: Application) -> None:
         
         # Initialize Outlook Graph session
         outlook = OutlookGraphProvider()
-        if outlook.is_authenticated():
+        if await outlook.is_authenticated_async():
             application.bot_data["graph_session"] = outlook.session
             print("✅ Outlook Graph session initialized for compose")
             
@@ -164,7 +183,7 @@ async def combined_message_handler(update: Update, context: ContextTypes.DEFAULT
     """Handle text messages for both reply and compose flows"""
     if context.user_data.get('awaiting_reply'):
         await handle_reply_message(update, context)
-    elif COMPOSE_AVAILABLE and context.user_data.get('composing'):
+    elif COMPOSE_AVAILABLE and context.user_data.get(ComposeState.FLOW):
         await handle_compose_message(update, context)
     else:
         # Send any message as a prompt to LLaMA.cpp
@@ -177,16 +196,29 @@ async def combined_message_handler(update: Update, context: ContextTypes.DEFAULT
             action="typing"
         )
         
-        try:
-            llm_client = LLMClient()
-            response = llm_client.chat(user_message, user_id=user_id, include_context=True)
-            await update.message.reply_text(response)
-        except Exception as e:
-            await update.message.reply_text(
-                f"� Sorry, I'm having trouble processing your message right now.\n"
-                f"Error: {str(e)}\n\n"
-                "You can try using commands like /start, /digest, /compose, or /status"
-            )
+        # Generation can take up to a minute and a half. Run it as a background
+        # task so this handler returns at once: PerChatUpdateProcessor would
+        # otherwise hold every later update from this chat (digest buttons,
+        # replies) behind the LLM call.
+        context.application.create_task(
+            _answer_with_llm(update.message, user_message, user_id), update=update
+        )
+
+
+async def _answer_with_llm(message, user_message: str, user_id: str) -> None:
+    """Post a placeholder, then edit in the LLM's answer once it is ready"""
+    placeholder = await message.reply_text("🤔 Thinking...")
+    try:
+        llm_client = LLMClient()
+        # Blocking HTTP to llama.cpp; keep it off the event loop
+        response = await asyncio.to_thread(llm_client.chat, user_message, user_id=user_id, include_context=True)
+        await placeholder.edit_text(response)
+    except Exception as e:
+        await placeholder.edit_text(
+            f"� Sorry, I'm having trouble processing your message right now.\n"
+            f"Error: {str(e)}\n\n"
+            "You can try using commands like /start, /digest, /compose, or /status"
+        )
 
 
 def main() -> None:
@@ -195,10 +227,31 @@ def main() -> None:
         print("❌ TELEGRAM_BOT_TOKEN not found in environment")
         return
     
+    # INFO by default so provider DEBUG chatter is skipped; LOG_LEVEL=DEBUG to see it
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    # httpx logs every getUpdates long-poll at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    # Handlers (formatting + stream/journal writes) run on a listener thread;
+    # handlers on the event loop only enqueue the record
+    log_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    listener = logging.handlers.QueueListener(log_queue, *root_logger.handlers, respect_handler_level=True)
+    root_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    listener.start()
+    atexit.register(listener.stop)
+
     print("🤖 Starting enhanced Telegram bot with compose functionality...")
     
     # Create application
-    application = Application.builder().token(TOKEN).build()
+    # Concurrent updates let a slow handler (provider send, LLM call) run
+    # without holding up other chats; within one chat updates stay in order
+    application = Application.builder().token(TOKEN).concurrent_updates(PerChatUpdateProcessor()).build()
+
+    # One repository shared by every handler instead of one per command
+    application.bot_data["email_repo"] = EmailRepo()
     
     # Add command handlers
     application.add_handler(CommandHandler("start", start))
@@ -240,7 +293,18 @@ def main() -> None:
     print("  • Email providers integration ready")
     
     # Start the bot
-    application.run_polling()
+    if WEBHOOK_URL:
+        url_path = TOKEN.split(":", 1)[-1]
+        print(f"🌐 Receiving updates via webhook on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}")
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=url_path,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{url_path}",
+            secret_token=WEBHOOK_SECRET,
+        )
+    else:
+        application.run_polling()
 
 
 if __name__ == "__main__":
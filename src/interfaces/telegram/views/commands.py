@@ -2,19 +2,19 @@
 Telegram command handlers for PA_V2
 Handles /commands like /digest, /compose, etc.
 """
-import sys
-import pathlib
 from telegram import Update
 from telegram.ext import CallbackContext
 
-# Add src to path for imports
-sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[3]))
-
 from services.email.email_repo import EmailRepo
 from .digest import build_digest
 from .compose_handlers import start_compose, handle_compose_message
 
-repo = EmailRepo()
+def _get_repo(context: CallbackContext) -> EmailRepo:
+    """Return the EmailRepo shared through bot_data, creating it on first use"""
+    repo = context.bot_data.get("email_repo")
+    if repo is None:
+        repo = context.bot_data["email_repo"] = EmailRepo()
+    return repo
 
 def handle_start(update: Update, context: CallbackContext):
     """Handle /start command"""
@@ -30,7 +30,7 @@ def handle_start(update: Update, context: CallbackContext):
 def handle_digest(update: Update, context: CallbackContext):
     """Handle /digest command"""
     try:
-        emails = repo.get_recent_emails(limit=10)
+        emails = _get_repo(context).get_recent_emails(limit=10)
         if not emails:
             update.message.reply_text("📭 No recent emails found.")
             return
@@ -44,8 +44,8 @@ def handle_digest(update: Update, context: CallbackContext):
             for email in emails
         ]
         
-        text, markup, _ = build_digest(rows)
-        update.message.reply_text(text, reply_markup=markup, parse_mode="Markdown")
+        text, markup, mode = build_digest(rows)
+        update.message.reply_text(text, reply_markup=markup, parse_mode=mode)
         
     except Exception as e:
         update.message.reply_text(f"❌ Failed to generate digest: {e}")
@@ -57,7 +57,7 @@ def handle_compose(update: Update, context: CallbackContext):
 def handle_status(update: Update, context: CallbackContext):
     """Handle /status command"""
     try:
-        recent_count = len(repo.get_recent_emails(limit=10))
+        recent_count = len(_get_repo(context).get_recent_emails(limit=10))
         update.message.reply_text(
             f"📊 **System Status**\n\n"
             f"• Database: ✅ Connected\n"
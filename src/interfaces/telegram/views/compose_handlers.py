@@ -3,12 +3,9 @@ Telegram compose email handlers for PA_V2
 Handles the multi-step email composition flow through Telegram interface
 """
 import os
-import sys
-import pathlib
-from typing import Dict, List
-
-# Add src to path for imports
-sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[3]))
+import re
+import asyncio
+import logging
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
@@ -18,18 +15,32 @@ from services.email.email_repo import EmailRepo
 from providers.gmail_send import gmail_send_message
 from providers.outlook_send import outlook_send_mail
 
+logger = logging.getLogger(__name__)
+
 # State keys for compose flow
 class ComposeState:
     FLOW = "cmp_flow"
     PROVIDER = "cmp_provider" 
     TO = "cmp_to"
+    TO_SET = "cmp_to_set"  # lowercased addresses in TO, for O(1) duplicate checks
     CC = "cmp_cc"
     BCC = "cmp_bcc"
     SUBJECT = "cmp_subject"
     BRIEF = "cmp_brief"
     DRAFT = "cmp_draft"
+    DRAFT_BRIEF = "cmp_draft_brief"  # brief the current DRAFT was built from
     OUTBOUND_ID = "cmp_outbound_id"
 
+# One address, no spaces, with a dot somewhere after the @
+_EMAIL_RE = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+
+# Everything cleared once an email has been sent
+_COMPOSE_KEYS = (
+    ComposeState.FLOW, ComposeState.PROVIDER, ComposeState.TO, ComposeState.TO_SET,
+    ComposeState.CC, ComposeState.BCC, ComposeState.SUBJECT, ComposeState.BRIEF,
+    ComposeState.DRAFT, ComposeState.DRAFT_BRIEF,
+)
+
 def _get_user_data(context: CallbackContext) -> dict:
     """Get user data dictionary"""
     return context.user_data
@@ -38,10 +49,20 @@ def _ensure_compose_state(context: CallbackContext) -> dict:
     """Ensure compose state is initialized"""
     ud = _get_user_data(context)
     ud.setdefault(ComposeState.TO, [])
+    ud.setdefault(ComposeState.TO_SET, set())
     ud.setdefault(ComposeState.CC, [])
     ud.setdefault(ComposeState.BCC, [])
     return ud
 
+def _add_recipient(ud: dict, email: str) -> bool:
+    """Append email to TO unless already present (case-insensitive); return True if added"""
+    key = email.lower()
+    if key in ud[ComposeState.TO_SET]:
+        return False
+    ud[ComposeState.TO].append(email)
+    ud[ComposeState.TO_SET].add(key)
+    return True
+
 async def start_compose(update: Update, context: CallbackContext):
     """Start the compose flow - choose provider"""
     ud = _ensure_compose_state(context)
@@ -83,8 +104,7 @@ async def handle_compose_callback(update: Update, context: CallbackContext):
     if data.startswith("cmp:addto:"):
         # Add contact to recipients
         email = data.split(":", 2)[-1]
-        if email not in ud[ComposeState.TO]:
-            ud[ComposeState.TO].append(email)
+        _add_recipient(ud, email)
         await query.answer(f"Added: {email}")
         
         await update.effective_chat.send_message(
@@ -100,8 +120,7 @@ async def handle_compose_callback(update: Update, context: CallbackContext):
     if data == "cmp:regen":
         # Regenerate draft
         brief = ud.get(ComposeState.BRIEF, '')
-        draft = f"Hi,\n\n{_brief_to_body(brief)}\n\nBest,\n"
-        ud[ComposeState.DRAFT] = draft
+        draft = _draft_for(ud, brief)
         
         keyboard = InlineKeyboardMarkup([[
             InlineKeyboardButton("✅ Approve & Send", callback_data="cmp:approve"),
@@ -129,16 +148,17 @@ async def handle_compose_message(update: Update, context: CallbackContext):
         if text.lower().startswith("find "):
             # Search for contacts
             query = text[5:].strip()
-            contacts = search_contacts(query, limit=8) or []
+            contacts = await asyncio.to_thread(search_contacts, query, limit=8) or []
             
             if not contacts:
                 await update.message.reply_text("❌ No contacts found.")
                 return
             
-            keyboard = InlineKeyboardMarkup([
+            keyboard_rows = [
                 [InlineKeyboardButton(f"{name} <{email}>", callback_data=f"cmp:addto:{email}")]
-                for (_id, name, email) in contacts
-            ])
+                for _id, name, email in contacts
+            ]
+            keyboard = InlineKeyboardMarkup(keyboard_rows)
             
             await update.message.reply_text("👥 **Select Contact:**", reply_markup=keyboard, parse_mode="Markdown")
             return
@@ -158,10 +178,9 @@ async def handle_compose_message(update: Update, context: CallbackContext):
             )
             return
         
-        if "@" in text and "." in text:
+        if _EMAIL_RE.fullmatch(text):
             # Add email address
-            if text not in ud[ComposeState.TO]:
-                ud[ComposeState.TO].append(text)
+            _add_recipient(ud, text)
             await update.message.reply_text(f"✅ Added: {text}\n\nType more or `done` to continue.")
             return
         
@@ -189,8 +208,7 @@ async def handle_compose_message(update: Update, context: CallbackContext):
     if ud[ComposeState.FLOW] == "brief":
         # Generate draft
         ud[ComposeState.BRIEF] = text
-        draft = f"Hi,\n\n{_brief_to_body(text)}\n\nBest,\n"
-        ud[ComposeState.DRAFT] = draft
+        draft = _draft_for(ud, text)
         
         keyboard = InlineKeyboardMarkup([[
             InlineKeyboardButton("✅ Approve & Send", callback_data="cmp:approve"),
@@ -210,27 +228,37 @@ def _brief_to_body(brief: str) -> str:
     """Convert brief to email body"""
     return brief.replace("- ", "• ").strip()
 
+def _draft_for(ud: dict, brief: str) -> str:
+    """Return the draft for brief, reusing the stored one if the brief hasn't changed"""
+    draft = ud.get(ComposeState.DRAFT)
+    if draft is None or ud.get(ComposeState.DRAFT_BRIEF) != brief:
+        draft = f"Hi,\n\n{_brief_to_body(brief)}\n\nBest,\n"
+        ud[ComposeState.DRAFT] = draft
+        ud[ComposeState.DRAFT_BRIEF] = brief
+    return draft
+
 async def _send_email_now(update: Update, context: CallbackContext):
     """Send the composed email"""
     query = update.callback_query
     ud = _get_user_data(context)
     
-    provider = ud.get(ComposeState.PROVIDER)
-    to_emails = ud.get(ComposeState.TO, [])
-    subject = ud.get(ComposeState.SUBJECT)
-    body = ud.get(ComposeState.DRAFT)
+    provider, to_emails, subject, body = (
+        ud.get(k) for k in (ComposeState.PROVIDER, ComposeState.TO, ComposeState.SUBJECT, ComposeState.DRAFT)
+    )
     
     if not all([provider, to_emails, subject, body]):
         await query.answer("❌ Missing required fields")
         return
     
     try:
-        repo = EmailRepo()
+        repo = context.bot_data.get("email_repo") or EmailRepo()
         
         if provider == "gmail":
             from_addr = os.getenv("GMAIL_FROM", "me@example.com")
             # Note: gmail_service needs to be available in context
-            sent = gmail_send_message(
+            # Provider calls block on network I/O; keep them off the event loop
+            sent = await asyncio.to_thread(
+                gmail_send_message,
                 context.bot_data.get("gmail_service"), 
                 from_addr, to_emails, [], [], subject, body, None
             )
@@ -239,7 +267,8 @@ async def _send_email_now(update: Update, context: CallbackContext):
         else:  # outlook
             from_addr = os.getenv("OUTLOOK_FROM", "me@example.com")
             # Note: graph_session needs to be available in context
-            outlook_send_mail(
+            await asyncio.to_thread(
+                outlook_send_mail,
                 context.bot_data.get("graph_session"),
                 from_addr, to_emails, [], [], subject, body, None
             )
@@ -248,20 +277,19 @@ async def _send_email_now(update: Update, context: CallbackContext):
         
         # Record in outbound table
         try:
-            outbound_id = repo.create_outbound_draft(
+            outbound_id = await asyncio.to_thread(
+                repo.create_outbound_draft,
                 provider, from_addr, to_emails, [], [], subject, body, None, None
             )
-            repo.mark_outbound_sent(outbound_id, msg_id, thread_id)
-        except Exception as e:
-            print(f"Warning: Failed to record outbound email: {e}")
+            await asyncio.to_thread(repo.mark_outbound_sent, outbound_id, msg_id, thread_id)
+        except Exception:
+            logger.exception("Failed to record outbound email")
         
         await query.message.reply_text("✅ **Email sent successfully!**", parse_mode="Markdown")
         await query.answer()
         
         # Clear compose state
-        for key in [ComposeState.FLOW, ComposeState.PROVIDER, ComposeState.TO, 
-                   ComposeState.CC, ComposeState.BCC, ComposeState.SUBJECT, 
-                   ComposeState.BRIEF, ComposeState.DRAFT]:
+        for key in _COMPOSE_KEYS:
             ud.pop(key, None)
         
     except Exception as e:
@@ -1,17 +1,17 @@
 # src/interfaces/telegram/views/digest.py
 import os
-import sys
-import pathlib
+from functools import lru_cache
+from html import escape
 from typing import Iterable, Tuple
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.constants import ParseMode
 
-# Add src to path for imports
-sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[3]))
-
 from services.email.email_repo import EmailRepo
 
-REPO = EmailRepo()
+@lru_cache(maxsize=1)
+def _repo() -> EmailRepo:
+    """Process-wide EmailRepo, created on first use rather than at import"""
+    return EmailRepo()
 
 # Provider icons (keep your preferred style)
 PROVIDER_ICON = {
@@ -31,36 +31,41 @@ BYU_LABEL = os.getenv("BYU_LABEL", "BYU_ASC59")
 BUSINESS_EMAIL = os.getenv("BUSINESS_EMAIL", "adriano@mentorius.app").lower()     # optional
 BUSINESS_DOMAIN = os.getenv("BUSINESS_DOMAIN", "mentorius.app").lower()           # optional
 
+# Precomputed once; these run for every digest row
+_BUSINESS_SUFFIX = f"@{BUSINESS_DOMAIN}" if BUSINESS_DOMAIN else None
+_PROVIDER_ICON_GET = PROVIDER_ICON.get
+_NO_TAGS = frozenset()
+
 def _lower_list(xs):
-    return [x.lower() for x in xs or []]
+    return (x.lower() for x in xs or ())
 
-def _any_address_matches(addresses, target_email, target_domain=None):
+def _any_address_matches(addresses, target_email, target_suffix=None):
+    """target_suffix is a precomputed "@domain" (e.g. _BUSINESS_SUFFIX)"""
     for a in _lower_list(addresses):
         if target_email and a == target_email:
             return True
-        if target_domain and a.endswith(f"@{target_domain}"):
+        if target_suffix and a.endswith(target_suffix):
             return True
     return False
 
-def _classify_badge(from_email: str, to_emails, cc_emails, bcc_emails, tags) -> str:
-    """Return one of: '🎓', '🏠', '💼' (if business applies), in that priority order."""
+def _classify_badge(from_email: str, to_emails, cc_emails, bcc_emails, tags: frozenset) -> str:
+    """Return one of: '🎓', '🏠', '💼' (if business applies), in that priority order.
+
+    tags is a frozenset (build it once per row with frozenset(tags or ())).
+    """
 
     # 1) School/edu hard rule: BYU label present
-    if BYU_LABEL in (tags or []):
+    if BYU_LABEL in tags:
         return "🎓"
 
     # (Optional) Business: if any party involves your business mailbox/domain
     #   Note: put business before personal-to so outbound/customer messages get 💼
-    all_parties = []
-    if from_email: all_parties.append(from_email)
-    all_parties.extend(to_emails or [])
-    all_parties.extend(cc_emails or [])
-    all_parties.extend(bcc_emails or [])
-    if _any_address_matches(all_parties, BUSINESS_EMAIL, BUSINESS_DOMAIN):
-        return "💼"
+    for parties in ((from_email,) if from_email else (), to_emails, cc_emails, bcc_emails):
+        if _any_address_matches(parties, BUSINESS_EMAIL, _BUSINESS_SUFFIX):
+            return "💼"
 
     # 2) Personal hard rule: anything addressed TO your personal Gmail
-    if _any_address_matches(to_emails or [], PERSONAL_TO_EMAIL):
+    if _any_address_matches(to_emails, PERSONAL_TO_EMAIL):
         return "🏠"
 
     # 3) Default: treat as personal if nothing else matched (your request kept logic simple)
@@ -69,46 +74,68 @@ def _classify_badge(from_email: str, to_emails, cc_emails, bcc_emails, tags) ->
 # -----------------------
 #  Row rendering
 # -----------------------
-def row_text(provider: str, sender: str, subject: str, snippet: str, badges: str = "") -> str:
-    prov = PROVIDER_ICON.get(provider, "✉️")
-    s_sender = sender or "(unknown)"
-    s_subject = subject or "(no subject)"
+def _row_fragments(provider: str, sender: str, subject: str, snippet: str, badges: str = "") -> tuple:
+    """Pieces of one digest row, joined once for the whole digest by build_digest.
+
+    HTML parse mode: only &, < and > need escaping (one html.escape per field),
+    unlike Markdown where an unescaped _ or * in a subject makes Telegram reject
+    the whole message.
+    """
     s_snip = (snippet or "").replace("\n", " ").strip()
     if len(s_snip) > 140:
         s_snip = s_snip[:137] + "…"
-    return f"{badges}{prov} *{s_sender}*\n_{s_subject}_\n{s_snip}"
+    # Bounded so any single row fits in one Telegram message
+    sender = sender or "(unknown)"
+    if len(sender) > 200:
+        sender = sender[:199] + "…"
+    subject = subject or "(no subject)"
+    if len(subject) > 300:
+        subject = subject[:299] + "…"
+    return (badges, _PROVIDER_ICON_GET(provider, "✉️"), " <b>", escape(sender, quote=False),
+            "</b>\n<i>", escape(subject, quote=False), "</i>\n", escape(s_snip, quote=False))
+
+def row_text(provider: str, sender: str, subject: str, snippet: str, badges: str = "") -> str:
+    return "".join(_row_fragments(provider, sender, subject, snippet, badges))
+
+# (label, callback prefix) for the per-row action buttons
+_ROW_BUTTONS = (
+    ("🔎 More",  "more"),
+    ("✍️ Reply", "reply"),
+    ("⭐",       "star"),
+    ("🗑",       "delreq"),
+)
 
 def build_digest(rows: Iterable[tuple]) -> Tuple[str, InlineKeyboardMarkup, str]:
     """
     rows: (email_id, provider, from_display, from_email, subject, snippet, received_at)
     returns: (text, markup, ParseMode)
     """
-    text_lines = []
+    parts = []
     keyboard_rows = []
 
-    for (email_id, provider, from_display, from_email, subject, snippet, _rcvd) in rows:
-        # Pull richer fields so we can classify
-        detail = REPO.get_email_detail(email_id)  # must include tags, to_emails, cc_emails, bcc_emails
-        tags      = detail.get("tags") or []
-        to_emails = detail.get("to_emails")  or []
-        cc_emails = detail.get("cc_emails")  or []
-        bcc_emails= detail.get("bcc_emails") or []
-
-        badge = _classify_badge(from_email or detail.get("from_email"),
-                                to_emails, cc_emails, bcc_emails, tags)
-        badges = f"{badge} "
+    rows = list(rows)
+    # Classify the whole digest in one query; Postgres returns just the badge
+    badges_by_id = _repo().get_email_badges_bulk(
+        [r[0] for r in rows],
+        byu_label=BYU_LABEL,
+        business_email=BUSINESS_EMAIL,
+        business_domain=BUSINESS_DOMAIN,
+    )
 
-        text_lines.append(row_text(provider, from_display or from_email, subject, snippet, badges=badges))
+    for (email_id, provider, from_display, from_email, subject, snippet, _rcvd) in rows:
+        # Rows missing from the DB fall back to classifying on the sender alone
+        badge = badges_by_id.get(email_id) or _classify_badge(from_email, (), (), (), _NO_TAGS)
+        if parts:
+            parts.append("\n\n")
+        parts.extend(_row_fragments(provider, from_display or from_email, subject, snippet, badges=f"{badge} "))
 
         keyboard_rows.append([
-            InlineKeyboardButton("🔎 More",  callback_data=f"more:{email_id}"),
-            InlineKeyboardButton("✍️ Reply", callback_data=f"reply:{email_id}"),
-            InlineKeyboardButton("⭐",       callback_data=f"star:{email_id}"),
-            InlineKeyboardButton("🗑",       callback_data=f"delreq:{email_id}"),
+            InlineKeyboardButton(label, callback_data=f"{prefix}:{email_id}")
+            for label, prefix in _ROW_BUTTONS
         ])
 
-    digest_text = "\n\n".join(text_lines) if text_lines else "No new emails."
-    return digest_text, InlineKeyboardMarkup(keyboard_rows), ParseMode.MARKDOWN
+    digest_text = "".join(parts) if parts else "No new emails."
+    return digest_text, InlineKeyboardMarkup(keyboard_rows), ParseMode.HTML
 
 def send_digest(bot, chat_id: int, rows: Iterable[tuple]):
     text, markup, mode = build_digest(rows)
@@ -4,19 +4,53 @@ Handles inline button interactions for email digest
 """
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import CallbackContext
-import sys
-import os
-
-# Add src to path for imports
-import pathlib
-sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[3]))
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from html import escape
+from typing import Dict
 
 from services.email.email_repo import EmailRepo
+from .compose_handlers import handle_compose_callback
+from .outlook_reply_handlers import create_reply_options_markup
+
+# Imported up front so the first delete doesn't pay the import on the event loop
+try:
+    from services.email.providers.gmail_actions import gmail_trash_thread
+except ImportError:
+    gmail_trash_thread = None  # Provider actions not available
+try:
+    from services.email.providers.outlook_actions import outlook_soft_delete_conversation
+except ImportError:
+    outlook_soft_delete_conversation = None  # Provider actions not available
 
-repo = EmailRepo()
+@lru_cache(maxsize=1)
+def _repo() -> EmailRepo:
+    """Process-wide EmailRepo, created on first use rather than at import"""
+    return EmailRepo()
 
+# Per-email locks, dropped again once nobody holds or waits on them
+_locks: Dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+_lock_users: Dict[int, int] = defaultdict(int)
+
+@asynccontextmanager
+async def _email_lock(email_id: int):
+    """Serialize callbacks that act on the same email"""
+    lock = _locks[email_id]
+    _lock_users[email_id] += 1
+    try:
+        async with lock:
+            yield
+    finally:
+        _lock_users[email_id] -= 1
+        if not _lock_users[email_id]:
+            del _lock_users[email_id]
+            del _locks[email_id]
+
+@lru_cache(maxsize=1024)
 def _confirm_delete_markup(email_id: int):
-    """Create confirmation markup for delete action"""
+    """Create confirmation markup for delete action (immutable, so safe to reuse)"""
     return InlineKeyboardMarkup([[
         InlineKeyboardButton("Delete", callback_data=f"delok:{email_id}"),
         InlineKeyboardButton("Cancel", callback_data=f"delcancel:{email_id}")
@@ -31,23 +65,31 @@ async def on_callback(update: Update, context: CallbackContext):
     
     # Handle compose callbacks
     if data.startswith("cmp:"):
-        from .compose_handlers import handle_compose_callback
         await handle_compose_callback(update, context)
         return
     
-    try:
-        action, id_str = data.split(":", 1)
-        email_id = int(id_str)
-    except Exception:
+    action, sep, id_str = data.partition(":")
+    if not sep or not (id_str.isascii() and id_str.isdigit()):
         await update.callback_query.answer("Bad callback")
         return
+    email_id = int(id_str)
+
+    # Double-clicks on the same email run one after another; different emails
+    # (and chats) still proceed concurrently
+    async with _email_lock(email_id):
+        await _dispatch_action(update, context, action, id_str, email_id)
 
+async def _dispatch_action(update: Update, context: CallbackContext, action: str, id_str: str, email_id: int):
+    """Run one digest action (star/more/reply/delete...) for email_id"""
     if action == "star":
         # Mark important tag in DB
         try:
-            repo.mark_important(email_id)
-            repo.touch(email_id, action="mark_important")
-            await update.callback_query.answer("Marked ⭐")
+            await asyncio.to_thread(_repo().mark_important, email_id)
+            # The bookkeeping write and the reply don't depend on each other
+            await asyncio.gather(
+                asyncio.to_thread(_repo().touch, email_id),
+                update.callback_query.answer("Marked ⭐"),
+            )
         except Exception as e:
             await update.callback_query.answer(f"Failed: {e}")
         return
@@ -55,7 +97,7 @@ async def on_callback(update: Update, context: CallbackContext):
     if action == "more":
         # Show detailed view
         try:
-            row = repo.get_email_detail(email_id)
+            row = _repo().get_email_detail_cached(email_id)
             if not row:
                 await update.callback_query.answer("Email not found")
                 return
@@ -67,10 +109,12 @@ async def on_callback(update: Update, context: CallbackContext):
             if len(snippet) > 1500:  # Telegram message limit safety
                 snippet = snippet[:1500] + "…"
                 
-            text = f"*From:* {from_d}\n*Subject:* {subject}\n\n{snippet}"
-            await update.effective_chat.send_message(text, parse_mode="Markdown")
-            repo.touch(email_id, action="view")
-            await update.callback_query.answer()
+            text = f"<b>From:</b> {escape(from_d)}\n<b>Subject:</b> {escape(subject)}\n\n{escape(snippet)}"
+            await asyncio.gather(
+                update.callback_query.message.reply_text(text, parse_mode="HTML"),
+                asyncio.to_thread(_repo().touch, email_id),
+                update.callback_query.answer(),
+            )
         except Exception as e:
             await update.callback_query.answer(f"Failed: {e}")
         return
@@ -78,37 +122,36 @@ async def on_callback(update: Update, context: CallbackContext):
     if action == "reply":
         # NEW: Enhanced reply with Outlook support
         try:
-            detail = repo.get_email_detail(email_id)
+            detail = _repo().get_email_detail_cached(email_id)
             if not detail:
                 update.callback_query.answer("Email not found")
                 return
             
-            # Import the enhanced reply functionality
-            from .outlook_reply_handlers import create_reply_options_markup
-            
             has_internet_message_id = bool(detail.get('internet_message_id'))
-            subject = detail.get("subject", "No Subject")
-            from_email = detail.get("from_email", "Unknown")
+            subject = escape(detail.get("subject") or "No Subject")
+            from_email = escape(detail.get("from_email") or "Unknown")
             
             # Show provider selection
             markup = create_reply_options_markup(email_id, has_internet_message_id)
             
             provider_info = ""
             if has_internet_message_id:
-                provider_info = "🏢 **BYU Email Detected** - Outlook reply available for proper threading\n\n"
+                provider_info = "🏢 <b>BYU Email Detected</b> - Outlook reply available for proper threading\n\n"
             
             await update.callback_query.message.edit_text(
-                f"**Choose Reply Method**\n\n"
+                f"<b>Choose Reply Method</b>\n\n"
                 f"{provider_info}"
                 f"To: {from_email}\n"
                 f"Re: {subject}\n\n"
                 f"How would you like to reply?",
                 reply_markup=markup,
-                parse_mode="Markdown"
+                parse_mode="HTML"
             )
             
-            await update.callback_query.answer("Choose reply method")
-            repo.touch(email_id)
+            await asyncio.gather(
+                update.callback_query.answer("Choose reply method"),
+                asyncio.to_thread(_repo().touch, email_id),
+            )
         except Exception as e:
             await update.callback_query.answer(f"Failed: {e}")
         return
@@ -128,57 +171,51 @@ async def on_callback(update: Update, context: CallbackContext):
     if action == "delok":
         # Confirm delete thread
         try:
-            em = repo.get_email_row(email_id)
+            em = _repo().get_email_row(email_id)
             if not em:
                 await update.callback_query.answer("Email not found")
                 return
                 
             deleted_by = f"telegram:{update.effective_user.id}"
             
-            # Import provider actions
-            if em["provider"] == "gmail":
-                try:
-                    from services.email.providers.gmail_actions import gmail_trash_thread
-                    # Would need gmail service - for now just mark in DB
-                    # gmail_trash_thread(context.bot_data["gmail_service"], em["provider_thread_id"])
-                except ImportError:
-                    pass  # Provider actions not available
-            elif em["provider"] == "outlook":
-                try:
-                    from services.email.providers.outlook_actions import outlook_soft_delete_conversation
-                    # Would need outlook session - for now just mark in DB
-                    # outlook_soft_delete_conversation(context.bot_data["outlook_session"], em["provider_thread_id"])
-                except ImportError:
-                    pass  # Provider actions not available
+            if em["provider"] == "gmail" and gmail_trash_thread is not None:
+                # Would need gmail service - for now just mark in DB
+                # gmail_trash_thread(context.bot_data["gmail_service"], em["provider_thread_id"])
+                pass
+            elif em["provider"] == "outlook" and outlook_soft_delete_conversation is not None:
+                # Would need outlook session - for now just mark in DB
+                # outlook_soft_delete_conversation(context.bot_data["outlook_session"], em["provider_thread_id"])
+                pass
             
             # Mark thread as deleted in database
-            repo.mark_thread_deleted(em["thread_id"], deleted_by, mode="soft")
+            await asyncio.to_thread(_repo().mark_thread_deleted, em["thread_id"], deleted_by, mode="soft")
             
             # Create undo button
             undo_markup = InlineKeyboardMarkup([[
                 InlineKeyboardButton("↩ Undo", callback_data=f"undodel:{em['thread_id']}")
             ]])
             
-            await update.callback_query.message.reply_text(
-                "Thread deleted. All messages moved to trash.",
-                reply_markup=undo_markup
+            await asyncio.gather(
+                update.callback_query.message.reply_text(
+                    "Thread deleted. All messages moved to trash.",
+                    reply_markup=undo_markup
+                ),
+                update.callback_query.answer("Deleted"),
             )
-            await update.callback_query.answer("Deleted")
         except Exception as e:
             await update.callback_query.answer(f"Failed: {e}")
         return
 
     if action == "delcancel":
-        # Cancel delete action
-        await update.callback_query.message.reply_text("Delete cancelled.")
-        await update.callback_query.answer()
+        # Cancel delete action: the callback toast is enough, no extra message
+        await update.callback_query.answer("Delete cancelled")
         return
 
     if action == "undodel":
         # Undo delete thread
         try:
             thread_id = int(id_str)
-            repo.restore_thread_deleted(thread_id)
+            _repo().restore_thread_deleted(thread_id)
             await update.callback_query.message.reply_text("Thread restored from trash.")
             await update.callback_query.answer("Restored")
         except Exception as e:
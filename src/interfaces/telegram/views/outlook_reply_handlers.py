@@ -2,12 +2,10 @@
 Enhanced email reply handlers with Outlook reply support
 Integrates with Internet Message-ID implementation
 """
-import sys
-import pathlib
-from typing import Optional
-
-# Add project root to path
-sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[3]))
+import asyncio
+from functools import lru_cache
+from html import escape
+from typing import Optional, Tuple
 
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import CallbackContext
@@ -15,8 +13,28 @@ from services.email.email_repo import EmailRepo
 from services.outlook.reply_service import reply_via_outlook_for_email_id
 
 
+# Only post a "Sending..." status if the Graph call hasn't finished by then;
+# fast replies get a single final message instead of a message plus an edit
+STATUS_MESSAGE_DELAY = 0.5
+
+
+@lru_cache(maxsize=1)
+def _repo() -> EmailRepo:
+    """Process-wide EmailRepo, created on first use rather than per callback"""
+    return EmailRepo()
+
+
+def _parse_callback(data: str) -> Optional[Tuple[str, int]]:
+    """'action:123' -> ('action', 123); None if malformed (no exception on the normal path)"""
+    action, sep, rest = data.partition(":")
+    if not sep or not (rest.isascii() and rest.isdigit()):
+        return None
+    return action, int(rest)
+
+
+@lru_cache(maxsize=1024)
 def create_reply_options_markup(email_id: int, has_internet_message_id: bool = False) -> InlineKeyboardMarkup:
-    """Create reply options keyboard based on email capabilities."""
+    """Create reply options keyboard based on email capabilities (immutable, so safe to reuse)."""
     buttons = []
     
     # Always offer Gmail reply (default)
@@ -38,24 +56,21 @@ async def handle_reply_selection(update: Update, context: CallbackContext) -> No
     if not query or not query.data:
         return
     
-    try:
-        action, email_id_str = query.data.split(":", 1)
-        email_id = int(email_id_str)
-    except Exception:
+    parsed = _parse_callback(query.data)
+    if parsed is None:
         await query.answer("Invalid callback data")
         return
+    action, email_id = parsed
     
-    repo = EmailRepo()
-    detail = repo.get_email_detail(email_id)
+    detail = _repo().get_email_detail_cached(email_id)
     
     if not detail:
         await query.answer("Email not found")
         return
     
-    if action == "reply_gmail":
-        await handle_gmail_reply(update, context, email_id, detail)
-    elif action == "reply_outlook":
-        await handle_outlook_reply(update, context, email_id, detail)
+    handler = _REPLY_HANDLERS.get(action)
+    if handler is not None:
+        await handler(update, context, email_id, detail)
     elif action == "reply_cancel":
         await query.answer("Reply cancelled")
         try:
@@ -77,15 +92,15 @@ async def handle_gmail_reply(update: Update, context: CallbackContext, email_id:
         'detail': detail
     }
     
-    subject = detail.get("subject", "No Subject")
-    from_email = detail.get("from_email", "Unknown")
+    subject = escape(detail.get("subject") or "No Subject")
+    from_email = escape(detail.get("from_email") or "Unknown")
     
     await query.message.edit_text(
-        f"📧 **Reply via Gmail**\n\n"
+        f"📧 <b>Reply via Gmail</b>\n\n"
         f"To: {from_email}\n"
         f"Re: {subject}\n\n"
         f"💬 Please type your reply message:",
-        parse_mode="Markdown"
+        parse_mode="HTML"
     )
     
     await query.answer("Type your Gmail reply")
@@ -100,9 +115,9 @@ async def handle_outlook_reply(update: Update, context: CallbackContext, email_i
     if not graph_session:
         await query.answer("❌ Outlook not configured")
         await query.message.edit_text(
-            "❌ **Outlook Reply Unavailable**\n\n"
+            "❌ <b>Outlook Reply Unavailable</b>\n\n"
             "Microsoft Graph session not configured. Please contact admin.",
-            parse_mode="Markdown"
+            parse_mode="HTML"
         )
         return
     
@@ -111,13 +126,13 @@ async def handle_outlook_reply(update: Update, context: CallbackContext, email_i
     if not internet_message_id:
         await query.answer("❌ No BYU message found")
         await query.message.edit_text(
-            "❌ **Outlook Reply Unavailable**\n\n"
+            "❌ <b>Outlook Reply Unavailable</b>\n\n"
             "This email doesn't have the original BYU message information needed for Outlook threading.\n\n"
             "This usually means:\n"
             "• Email is not from BYU system\n"
             "• Email was received before Internet Message-ID support\n\n"
             "💡 Use Gmail reply instead.",
-            parse_mode="Markdown"
+            parse_mode="HTML"
         )
         return
     
@@ -129,21 +144,28 @@ async def handle_outlook_reply(update: Update, context: CallbackContext, email_i
         'internet_message_id': internet_message_id
     }
     
-    subject = detail.get("subject", "No Subject")
-    from_email = detail.get("from_email", "Unknown")
+    subject = escape(detail.get("subject") or "No Subject")
+    from_email = escape(detail.get("from_email") or "Unknown")
     
     await query.message.edit_text(
-        f"🏢 **Reply via Outlook (BYU)**\n\n"
+        f"🏢 <b>Reply via Outlook (BYU)</b>\n\n"
         f"To: {from_email}\n"
         f"Re: {subject}\n\n"
-        f"📧 Original Message-ID: `{internet_message_id}`\n\n"
+        f"📧 Original Message-ID: <code>{escape(internet_message_id)}</code>\n\n"
         f"💬 Please type your reply message:",
-        parse_mode="Markdown"
+        parse_mode="HTML"
     )
     
     await query.answer("Type your Outlook reply")
 
 
+# Reply method -> handler, looked up once per callback by handle_reply_selection
+_REPLY_HANDLERS = {
+    "reply_gmail": handle_gmail_reply,
+    "reply_outlook": handle_outlook_reply,
+}
+
+
 async def handle_reply_message(update: Update, context: CallbackContext) -> None:
     """Handle the actual reply message text from user."""
     reply_context = context.user_data.get('awaiting_reply')
@@ -172,21 +194,19 @@ async def send_gmail_reply(update: Update, context: CallbackContext, email_id: i
     """Send reply via Gmail."""
     # This would integrate with existing Gmail sending functionality
     # For now, just create a draft
-    repo = EmailRepo()
-    
     try:
-        draft_id = repo.add_draft(email_id, reply_text)
+        draft_id = _repo().add_draft(email_id, reply_text)
         
-        subject = detail.get("subject", "No Subject")
-        from_email = detail.get("from_email", "Unknown")
+        subject = escape(detail.get("subject") or "No Subject")
+        from_email = escape(detail.get("from_email") or "Unknown")
         
         await update.message.reply_text(
-            f"✅ **Gmail Reply Draft Created**\n\n"
+            f"✅ <b>Gmail Reply Draft Created</b>\n\n"
             f"📧 Draft ID: {draft_id}\n"
             f"To: {from_email}\n"
             f"Re: {subject}\n\n"
             f"💡 Draft saved for manual sending via Gmail interface.",
-            parse_mode="Markdown"
+            parse_mode="HTML"
         )
         
     except Exception as e:
@@ -200,41 +220,51 @@ async def send_outlook_reply(update: Update, context: CallbackContext, email_id:
         await update.message.reply_text("❌ Outlook Graph session not available")
         return
     
-    from_email = detail.get("from_email", "Unknown")
-    subject = detail.get("subject", "No Subject")
-    
-    # Show sending status
-    status_msg = await update.message.reply_text(
-        f"🔄 **Sending Outlook Reply...**\n\n"
-        f"To: {from_email}\n"
-        f"Re: {subject}\n\n"
-        f"Please wait...",
-        parse_mode="Markdown"
-    )
+    from_email = escape(detail.get("from_email") or "Unknown")
+    subject = escape(detail.get("subject") or "No Subject")
     
+    status_msg = None
+
+    async def finish(text: str) -> None:
+        """Final outcome: edit the status message if one was shown, else send it"""
+        if status_msg is not None:
+            await status_msg.edit_text(text, parse_mode="HTML")
+        else:
+            await update.message.reply_text(text, parse_mode="HTML")
+
     try:
-        # Use the Outlook reply service
-        result = reply_via_outlook_for_email_id(
+        # Use the Outlook reply service (blocking Graph calls, so off the event loop)
+        send_task = asyncio.ensure_future(asyncio.to_thread(
+            reply_via_outlook_for_email_id,
             graph_session,
             email_id,
             reply_text,
             extra_cc=[],  # Could add CC options in future
             extra_bcc=[]  # Could add BCC options in future
-        )
+        ))
+        done, _ = await asyncio.wait({send_task}, timeout=STATUS_MESSAGE_DELAY)
+        if not done:
+            # Slow path: show sending status while Graph works
+            status_msg = await update.message.reply_text(
+                f"🔄 <b>Sending Outlook Reply...</b>\n\n"
+                f"To: {from_email}\n"
+                f"Re: {subject}\n\n"
+                f"Please wait...",
+                parse_mode="HTML"
+            )
+        result = await send_task
         
         if result == "sent":
-            await status_msg.edit_text(
-                f"✅ **Outlook Reply Sent Successfully!**\n\n"
+            await finish(
+                f"✅ <b>Outlook Reply Sent Successfully!</b>\n\n"
                 f"To: {from_email}\n"
                 f"Re: {subject}\n\n"
                 f"🏢 Sent via BYU Outlook with proper threading\n"
-                f"📧 Check your Outlook Sent Items for confirmation",
-                parse_mode="Markdown"
+                f"📧 Check your Outlook Sent Items for confirmation"
             )
             
             # Touch the email to mark it as replied
-            repo = EmailRepo()
-            repo.touch(email_id)
+            await asyncio.to_thread(_repo().touch, email_id)
             
         else:
             # Handle various error conditions with user-friendly messages
@@ -246,25 +276,23 @@ async def send_outlook_reply(update: Update, context: CallbackContext, email_id:
                 "send_failed": "❌ Failed to send reply via Outlook"
             }
             
-            error_msg = error_messages.get(result, f"❌ Unknown error: {result}")
+            error_msg = error_messages.get(result, f"❌ Unknown error: {escape(str(result))}")
             
-            await status_msg.edit_text(
-                f"**Outlook Reply Failed**\n\n"
+            await finish(
+                f"<b>Outlook Reply Failed</b>\n\n"
                 f"To: {from_email}\n"
                 f"Re: {subject}\n\n"
                 f"{error_msg}\n\n"
-                f"💡 Try using Gmail reply instead, or compose a new email.",
-                parse_mode="Markdown"
+                f"💡 Try using Gmail reply instead, or compose a new email."
             )
     
     except Exception as e:
-        await status_msg.edit_text(
-            f"❌ **Outlook Reply Error**\n\n"
+        await finish(
+            f"❌ <b>Outlook Reply Error</b>\n\n"
             f"To: {from_email}\n"
             f"Re: {subject}\n\n"
-            f"Error: {str(e)}\n\n"
-            f"💡 Try using Gmail reply instead.",
-            parse_mode="Markdown"
+            f"Error: {escape(str(e))}\n\n"
+            f"💡 Try using Gmail reply instead."
         )
 
 
@@ -281,39 +309,37 @@ def enhance_reply_button_handler(original_handler):
         if not query.data.startswith("reply:"):
             return await original_handler(update, context)
         
-        try:
-            _, email_id_str = query.data.split(":", 1)
-            email_id = int(email_id_str)
-        except Exception:
+        parsed = _parse_callback(query.data)
+        if parsed is None:
             return await original_handler(update, context)
+        email_id = parsed[1]
         
         # Get email details to check for Internet Message-ID
-        repo = EmailRepo()
-        detail = repo.get_email_detail(email_id)
+        detail = _repo().get_email_detail_cached(email_id)
         
         if not detail:
             await query.answer("Email not found")
             return
         
         has_internet_message_id = bool(detail.get('internet_message_id'))
-        subject = detail.get("subject", "No Subject")
-        from_email = detail.get("from_email", "Unknown")
+        subject = escape(detail.get("subject") or "No Subject")
+        from_email = escape(detail.get("from_email") or "Unknown")
         
         # Show provider selection
         markup = create_reply_options_markup(email_id, has_internet_message_id)
         
         provider_info = ""
         if has_internet_message_id:
-            provider_info = "🏢 **BYU Email Detected** - Outlook reply available for proper threading\n\n"
+            provider_info = "🏢 <b>BYU Email Detected</b> - Outlook reply available for proper threading\n\n"
         
         await query.message.edit_text(
-            f"**Choose Reply Method**\n\n"
+            f"<b>Choose Reply Method</b>\n\n"
             f"{provider_info}"
             f"To: {from_email}\n"
             f"Re: {subject}\n\n"
             f"How would you like to reply?",
             reply_markup=markup,
-            parse_mode="Markdown"
+            parse_mode="HTML"
         )
         
         await query.answer("Choose reply method")
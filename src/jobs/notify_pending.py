@@ -17,11 +17,14 @@ sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
 
 from services.email.email_repo import EmailRepo
 from interfaces.telegram.views.digest import build_digest
-import requests
+from shared.http_session import make_session
+from shared.rate_limit import post_telegram
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
+_SESSION = make_session()
+
 
 def main(hours: int = 24, batch: int = 20) -> int:
     repo = EmailRepo()
@@ -60,13 +63,13 @@ def main(hours: int = 24, batch: int = 20) -> int:
     payload = {
         "chat_id": int(TELEGRAM_CHAT_ID),
         "text": text,
-        "parse_mode": "Markdown",
+        "parse_mode": mode,
         "reply_markup": {"inline_keyboard": keyboard_data}
     }
 
     sent = 0
     try:
-        resp = requests.post(url, json=payload, timeout=15)
+        resp = post_telegram(_SESSION, url, json=payload, timeout=15)
         if resp.status_code == 200:
             sent = len(rows)
             print(f"✅ Sent digest for {sent} pending emails")
@@ -77,12 +80,11 @@ def main(hours: int = 24, batch: int = 20) -> int:
         print(f"❌ Failed to send digest: {ex}")
         return 0
 
-    # Mark as notified to prevent duplicates
-    for e in unnotified:
-        try:
-            repo.mark_notified(e["id"])
-        except Exception as ex:
-            print(f"⚠️ Failed to mark email {e['id']} as notified: {ex}")
+    # Mark as notified to prevent duplicates (one UPDATE for the whole batch)
+    try:
+        repo.mark_notified_many([e["id"] for e in unnotified])
+    except Exception as ex:
+        print(f"⚠️ Failed to mark {len(unnotified)} emails as notified: {ex}")
 
     return sent
 
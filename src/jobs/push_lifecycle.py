@@ -1,20 +1,25 @@
 """Gmail push notification lifecycle management."""
 import os
 import sys
+import logging
 import pathlib
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 
 # Add project root to path
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
 
 from repo.push_repo import PushRepo
-from providers.gmail_helpers import build_service, get_label_id
-from providers.gmail_admin import gmail_watch_start
+
+logger = logging.getLogger(__name__)
 
 # Configuration from environment
 GMAIL_TOKEN_PATH = os.getenv("GMAIL_TOKEN_PATH", "config/gmail_token.json")
 GCP_TOPIC = os.getenv("GMAIL_PUBSUB_TOPIC", "projects/your-project/topics/gmail-push")
-WATCH_LABELS = os.getenv("GMAIL_WATCH_LABELS", "INBOX,BYU_ASC59").split(",")
+# Normalized once: stripped, and empty entries (e.g. a trailing comma) dropped
+WATCH_LABELS = tuple(
+    name for name in (x.strip() for x in os.getenv("GMAIL_WATCH_LABELS", "INBOX,BYU_ASC59").split(","))
+    if name
+)
 
 
 def _load_creds():
@@ -27,10 +32,15 @@ def _load_creds():
 
 def run():
     """Set up or renew Gmail push notifications."""
-    print(f"🔧 Setting up Gmail push notifications...")
-    print(f"📋 Topic: {GCP_TOPIC}")
-    print(f"🏷️ Labels: {WATCH_LABELS}")
+    # Google API client imports are heavy; load them only when actually renewing
+    from providers.gmail_helpers import build_service, get_label_id
+    from providers.gmail_admin import gmail_watch_start
+
+    logger.info("🔧 Setting up Gmail push notifications...")
+    logger.info("📋 Topic: %s", GCP_TOPIC)
+    logger.info("🏷️ Labels: %s", WATCH_LABELS)
     
+    push = None
     try:
         push = PushRepo()
         creds = _load_creds()
@@ -39,20 +49,19 @@ def run():
         # Resolve label IDs by name
         label_ids = []
         for name in WATCH_LABELS:
-            name = name.strip()
             if name == "INBOX":
                 label_ids.append("INBOX")
             else:
                 try:
                     label_id = get_label_id(svc, name)
                     label_ids.append(label_id)
-                    print(f"✅ Found label '{name}' -> ID: {label_id}")
+                    logger.info("✅ Found label '%s' -> ID: %s", name, label_id)
                 except RuntimeError as e:
-                    print(f"⚠️ {e}")
+                    logger.warning("⚠️ %s", e)
                     continue
 
         if not label_ids:
-            print("❌ No valid labels found to watch")
+            logger.error("❌ No valid labels found to watch")
             return False
 
         # Start Gmail watch
@@ -61,9 +70,9 @@ def run():
         history_id = result.get("historyId")
         expiration = result.get("expiration")  # Unix timestamp in milliseconds
         
-        print(f"🎉 Gmail watch started successfully!")
-        print(f"📊 History ID: {history_id}")
-        print(f"⏰ Expires: {expiration}")
+        logger.info("🎉 Gmail watch started successfully!")
+        logger.info("📊 History ID: %s", history_id)
+        logger.info("⏰ Expires: %s", expiration)
         
         # Update database state
         if history_id:
@@ -73,21 +82,41 @@ def run():
             # Convert milliseconds to datetime
             exp_dt = datetime.fromtimestamp(int(expiration) / 1000, tz=timezone.utc)
             push.update_gmail_watch(exp_dt)
-            print(f"📅 Watch expires at: {exp_dt}")
+            logger.info("📅 Watch expires at: %s", exp_dt)
         
         push.set_push_state("gmail", "healthy")
         return True
         
+    except (FileNotFoundError, ValueError) as e:
+        # Missing or malformed token file: retrying won't help, so let the
+        # caller (and any retry wrapper) see the real error
+        logger.error("❌ Gmail push setup cannot succeed without valid credentials: %s", e)
+        _mark_down(push)
+        raise
     except Exception as e:
-        print(f"❌ Error setting up Gmail push: {e}")
-        push.set_push_state("gmail", "down")
+        logger.error("❌ Error setting up Gmail push: %s", e)
+        _mark_down(push)
         return False
 
 
+def _mark_down(push) -> None:
+    """Record the failed renewal, if the DB was reachable in the first place."""
+    if push is None:
+        return
+    try:
+        push.set_push_state("gmail", "down")
+    except Exception as e:
+        logger.warning("⚠️ Could not record Gmail push state: %s", e)
+
+
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
     success = run()
     if success:
-        print("✅ Gmail push lifecycle setup complete")
+        logger.info("✅ Gmail push lifecycle setup complete")
     else:
-        print("❌ Gmail push lifecycle setup failed")
+        logger.error("❌ Gmail push lifecycle setup failed")
         sys.exit(1)
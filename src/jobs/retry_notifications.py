@@ -3,8 +3,13 @@
 Retry failed notifications for emails that are stored but not notified.
 This handles cases where webhook processing succeeded but notification failed.
 """
+import os
 import sys
+import logging
 import pathlib
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
 # Load environment secrets
@@ -14,12 +19,53 @@ load_dotenv('/etc/pa_v2/secrets.env')
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
 
 from services.email.email_repo import EmailRepo
-from webhooks.svc import send_telegram_digest
+from webhooks.svc import send_telegram_digest_rows
+
+logger = logging.getLogger(__name__)
+
+# Per-process RNG so concurrent retry workers back off on different schedules;
+# tests can swap in a seeded random.Random
+RNG = random.Random()
+
+# Sends are blocking HTTPS round-trips; this many run at once (the shared
+# Telegram token bucket still paces the actual sendMessage rate)
+RETRY_CONCURRENCY = int(os.getenv("RETRY_CONCURRENCY", "8"))
+
+
+def _send_with_backoff(row: tuple, base: float = 0.5, cap: float = 30.0, max_attempts: int = 5) -> bool:
+    """Send one email's digest with exponential backoff and full jitter.
+
+    row is the digest tuple (email_id, provider, from_display, from_email,
+    subject, snippet, received_at), already read by list_recent_unnotified,
+    so a send costs no database round-trip. Between attempts it sleeps
+    uniform(0, min(cap, base * 2**attempt)) seconds, so a Telegram/network
+    hiccup recovers within this run instead of failing the whole batch.
+
+    Returns True once a send succeeds, False when all attempts are used up.
+    Only the last attempt falls back to a plain-text message, so the user
+    gets at most one.
+    """
+    email_id = row[0]
+    for attempt in range(max_attempts):
+        try:
+            if send_telegram_digest_rows([row], fallback=attempt + 1 == max_attempts):
+                return True
+            error = "digest not accepted"
+        except Exception as e:
+            error = e
+        if attempt + 1 < max_attempts:
+            delay = RNG.random() * min(cap, base * (2 ** attempt))
+            logger.info("⏳ Notification for email %s failed (%s); retrying in %.1fs", email_id, error, delay)
+            time.sleep(delay)
+    logger.error("❌ Giving up on email %s after %d attempts: %s", email_id, max_attempts, error)
+    return False
 
 def main():
     """Check for unnotified emails and retry sending notifications."""
-    print("🔄 Checking for unnotified emails...")
+    logger.info("🔄 Checking for unnotified emails...")
     
+    # The job's only queries are the listing below and one bulk mark at the
+    # end; sends reuse the listed rows instead of re-reading each email
     repo = EmailRepo()
     
     try:
@@ -27,31 +73,42 @@ def main():
         unnotified = repo.list_recent_unnotified(since_hours=24, limit=50)
         
         if not unnotified:
-            print("✅ No unnotified emails found")
+            logger.info("✅ No unnotified emails found")
             return
         
-        print(f"📧 Found {len(unnotified)} unnotified emails")
+        logger.info("📧 Found %d unnotified emails", len(unnotified))
         
-        for email in unnotified:
-            email_id = email['id']
-            subject = email.get('subject', 'No Subject')
-            
-            print(f"🔔 Retrying notification for email {email_id}: {subject}")
+        with ThreadPoolExecutor(max_workers=max(1, RETRY_CONCURRENCY)) as executor:
+            futures = {}
+            for email in unnotified:
+                email_id = email['id']
+                subject = email.get('subject', 'No Subject')
+                
+                logger.info("🔔 Retrying notification for email %s: %s", email_id, subject)
+                row = (email_id, email['provider'], email['from_display'], email['from_email'],
+                       email['subject'], email['snippet'], email['received_at'])
+                futures[executor.submit(_send_with_backoff, row)] = email_id
             
+            notified_ids = []
             try:
-                send_telegram_digest(email_id)
-                repo.mark_notified(email_id)
-                print(f"✅ Successfully notified for email {email_id}")
-            except Exception as e:
-                print(f"❌ Failed to notify email {email_id}: {e}")
-                # Continue with other emails even if one fails
+                for future in as_completed(futures):
+                    email_id = futures[future]
+                    # Only mark on success; exhausted retries are left for the next run
+                    if future.result():
+                        notified_ids.append(email_id)
+                        logger.info("✅ Successfully notified for email %s", email_id)
+            finally:
+                # One UPDATE for the whole batch instead of a round-trip per email
+                repo.mark_notified_many(notified_ids)
         
-        print("🎉 Notification retry completed")
+        logger.info("🎉 Notification retry completed")
         
     except Exception as e:
-        print(f"❌ Error in notification retry: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error in notification retry: %s", e)
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
     main()
@@ -7,14 +7,14 @@ This script provides a command-line interface to various PA_V2 functions.
 import sys
 import os
 import argparse
-import time
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add src directory to path for imports
 sys.path.insert(0, os.path.dirname(__file__))
 
-from services.email.integration import send_email, get_latest_emails, EmailProviderRegistry
+# Commands import services.email.integration on first use; providers (and
+# their Google/MSAL clients) load only when one is actually used
 
 def setup_auth():
     """Run email authentication setup"""
@@ -38,6 +38,7 @@ def test_email():
 
 def send_email_cmd(args):
     """Send an email via command line"""
+    from services.email.integration import send_email
     result = send_email(
         provider=args.provider,
         to=args.to,
@@ -51,23 +52,23 @@ def send_email_cmd(args):
     else:
         print(f"❌ Failed to send email: {result['message']}")
 
-def check_auth_status():
-    """Check authentication status of email providers"""
-    try:
-        from services.email.providers.gmail_provider import GmailProvider
-        gmail = GmailProvider()
-        gmail_auth = gmail.is_authenticated()
-    except Exception:
-        gmail_auth = False
-    
+def _authenticated(registry, name: str) -> bool:
     try:
-        from services.email.providers.outlook_provider import OutlookGraphProvider
-        outlook = OutlookGraphProvider()
-        outlook_auth = outlook.is_authenticated()
+        provider = registry.get_provider(name)
+        return provider is not None and provider.is_authenticated()
     except Exception:
-        outlook_auth = False
-    
-    return {'gmail': gmail_auth, 'outlook': outlook_auth}
+        return False
+
+def check_auth_status():
+    """Check authentication status of email providers"""
+    # Reuse the provider instances registered at import instead of building
+    # (and loading tokens into) new ones on every check
+    from services.email.integration import EmailProviderRegistry
+    # Each probe may refresh a token over the network; run them side by side
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        gmail_auth = executor.submit(_authenticated, EmailProviderRegistry, 'gmail')
+        outlook_auth = executor.submit(_authenticated, EmailProviderRegistry, 'outlook')
+        return {'gmail': gmail_auth.result(), 'outlook': outlook_auth.result()}
 
 def check_email_auth():
     """Check email authentication status"""
@@ -84,6 +85,7 @@ def check_email_auth():
 
 def list_providers():
     """List available email providers"""
+    from services.email.integration import EmailProviderRegistry
     providers = EmailProviderRegistry.get_all_providers()
     print("Available email providers:")
     for provider in providers:
@@ -0,0 +1,10 @@
+-- Safe to run multiple times
+-- Trigram index so contact search ('%john%') is an index lookup instead of a
+-- sequential scan of email_messages; the expression must match
+-- ContactsRepo.search_contacts exactly
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_email_messages_sender_search_trgm
+  ON email_messages
+  USING gin ((lower(COALESCE(from_display, '') || ' ' || from_email)) gin_trgm_ops)
+  WHERE from_email IS NOT NULL AND from_email != '';
@@ -0,0 +1,7 @@
+"""Microsoft Graph recipient objects, shared by the Outlook send and reply helpers."""
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def graph_recipients(addresses: Optional[Iterable[str]]) -> List[Dict[str, Any]]:
+    """Email addresses -> Graph recipient objects ({"emailAddress": {"address": ...}})."""
+    return [{"emailAddress": {"address": a}} for a in addresses or ()]
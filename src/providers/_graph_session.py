@@ -0,0 +1,23 @@
+"""Default Microsoft Graph session for the Outlook helper functions.
+
+The helpers in this package take a Graph session argument; callers that
+don't have one get the Outlook provider's pooled, authenticated
+GraphSession, so consecutive delta pages and sends reuse one keep-alive
+connection instead of each caller building its own.
+"""
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def get_graph_session():
+    """Process-wide GraphSession (base URL + bearer token injection, pooled adapter).
+
+    Raises:
+        RuntimeError: If the Outlook provider isn't configured
+    """
+    from services.email.integration import EmailProviderRegistry
+
+    provider = EmailProviderRegistry.get_provider("outlook")
+    if provider is None:
+        raise RuntimeError("Outlook provider not configured; pass a Graph session explicitly")
+    return provider.session
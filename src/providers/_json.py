@@ -0,0 +1,15 @@
+"""JSON codec for the Graph helpers: orjson when installed, stdlib json otherwise.
+
+orjson parses and serializes Graph payloads several times faster; both
+``loads`` accept the raw ``response.content`` bytes, so callers never need
+``response.json()``'s extra decode step.
+"""
+import json
+
+try:
+    import orjson
+    loads = orjson.loads
+    dumps = orjson.dumps
+except ImportError:
+    loads = json.loads
+    dumps = json.dumps
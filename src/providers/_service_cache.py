@@ -0,0 +1,42 @@
+"""Memoized Gmail API service objects.
+
+googleapiclient's build() parses the ~1 MB discovery document and sets up a
+fresh httplib2 connection on every call. Services are cached per credentials
+identity instead, so admin/send/webhook helpers reuse one.
+"""
+import threading
+from typing import Any, Dict, Tuple
+
+from googleapiclient.discovery import build
+
+# httplib2 (under every service object) is not thread-safe, so each thread
+# keeps its own cache: {creds key: service}
+_local = threading.local()
+
+
+def _creds_key(creds) -> Tuple[Any, ...]:
+    """Stable identity for credentials loaded from the same token file.
+
+    Callers reload creds from disk per request, so id(creds) would never hit;
+    the refresh token (plus client and scopes) is what identifies the account.
+    A cached service keeps its own creds object, which refreshes itself.
+    """
+    refresh_token = getattr(creds, "refresh_token", None)
+    if not refresh_token:
+        return ("id", id(creds))
+    return (getattr(creds, "client_id", None), refresh_token, tuple(sorted(getattr(creds, "scopes", None) or ())))
+
+
+def get_gmail_service(creds):
+    """Gmail v1 service for creds, built once per thread and account."""
+    cache: Dict[Tuple[Any, ...], Any] = getattr(_local, "services", None)
+    if cache is None:
+        cache = _local.services = {}
+    key = _creds_key(creds)
+    service = cache.get(key)
+    if service is None:
+        # static_discovery uses the discovery doc bundled with the library (no HTTP fetch)
+        service = cache[key] = build("gmail", "v1", credentials=creds,
+                                     cache_discovery=False, static_discovery=True)
+    return service
+
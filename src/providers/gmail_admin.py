@@ -1,6 +1,6 @@
 """Gmail administration functions for webhook management."""
 from typing import List, Dict
-from googleapiclient.discovery import build
+from providers._service_cache import get_gmail_service
 
 
 def gmail_watch_start(creds, topic_name: str, label_ids: List[str]) -> Dict:
@@ -15,7 +15,7 @@ def gmail_watch_start(creds, topic_name: str, label_ids: List[str]) -> Dict:
     Returns:
         Dict with 'historyId' and 'expiration' fields
     """
-    svc = build("gmail", "v1", credentials=creds)
+    svc = get_gmail_service(creds)
     body = {"topicName": topic_name}
     if label_ids:
         body["labelIds"] = label_ids
@@ -25,11 +25,11 @@ def gmail_watch_start(creds, topic_name: str, label_ids: List[str]) -> Dict:
 
 def gmail_stop_watch(creds) -> Dict:
     """Stop Gmail push notifications."""
-    svc = build("gmail", "v1", credentials=creds)
+    svc = get_gmail_service(creds)
     return svc.users().stop(userId="me").execute()
 
 
 def gmail_get_profile(creds) -> Dict:
     """Get Gmail profile information."""
-    svc = build("gmail", "v1", credentials=creds)
+    svc = get_gmail_service(creds)
     return svc.users().getProfile(userId="me").execute()
@@ -1,12 +1,34 @@
 """Gmail helper functions for API operations."""
-from typing import Dict, Any, List
-from googleapiclient.discovery import build
+import logging
+import time
+from typing import Dict, Any, List, Tuple
 from google.oauth2.credentials import Credentials
 
+from providers._service_cache import _creds_key, get_gmail_service
+
+logger = logging.getLogger(__name__)
+
+# Labels are near-static per mailbox, so one labels.list serves every
+# get_label_id lookup for an hour.
+# Keyed by account (see _creds_key) -> (monotonic timestamp, {label name: label id})
+LABEL_CACHE_TTL = 3600.0
+LABEL_CACHE_MAXSIZE = 32
+_LABEL_CACHE: Dict[Tuple[Any, ...], Tuple[float, Dict[str, str]]] = {}
+
+# Partial-response masks: Gmail only serializes (and we only parse) what
+# the webhook path reads. Bodies stay in MESSAGE_FIELDS because they are
+# stored; parts nest (mixed > alternative > text/plain), hence the recursion.
+_PART_FIELDS = "mimeType,body/data"
+MESSAGE_FIELDS = (
+    "id,threadId,labelIds,snippet,"
+    f"payload({_PART_FIELDS},headers(name,value),parts({_PART_FIELDS},parts({_PART_FIELDS},parts)))"
+)
+HISTORY_FIELDS = "historyId,nextPageToken,history(id,messagesAdded/message(id,threadId,labelIds))"
+
 
 def build_service(creds: Credentials):
-    """Build Gmail API service object."""
-    return build("gmail", "v1", credentials=creds)
+    """Gmail API service object (built once per account, then reused)."""
+    return get_gmail_service(creds)
 
 
 def get_label_id(svc, label_name: str) -> str:
@@ -23,28 +45,83 @@ def get_label_id(svc, label_name: str) -> str:
     Raises:
         RuntimeError: If label is not found
     """
-    labels_result = svc.users().labels().list(userId="me").execute()
-    labels = labels_result.get("labels", [])
-    
-    for label in labels:
-        if label["name"] == label_name:
-            return label["id"]
-    
-    raise RuntimeError(f"Label not found: {label_name}")
+    try:
+        return _labels_snapshot(svc)[label_name]
+    except KeyError:
+        raise RuntimeError(f"Label not found: {label_name}") from None
 
 
-def gmail_fetch_message_by_id(svc, msg_id: str) -> Dict[str, Any]:
+def _labels_snapshot(svc) -> Dict[str, str]:
+    """Label name -> id for this service's mailbox (memoized for LABEL_CACHE_TTL seconds)"""
+    # Per-thread services for one account share an entry; the creds live on
+    # the service's AuthorizedHttp
+    creds = getattr(getattr(svc, "_http", None), "credentials", None)
+    key = _creds_key(creds) if creds is not None else ("id", id(svc))
+    cached = _LABEL_CACHE.get(key)
+    if cached and time.monotonic() - cached[0] < LABEL_CACHE_TTL:
+        return cached[1]
+    labels = {label["name"]: label["id"] for label in get_all_labels(svc)}
+    _LABEL_CACHE.pop(key, None)
+    if len(_LABEL_CACHE) >= LABEL_CACHE_MAXSIZE:
+        # Oldest first (dicts keep insertion order)
+        _LABEL_CACHE.pop(next(iter(_LABEL_CACHE)))
+    _LABEL_CACHE[key] = (time.monotonic(), labels)
+    return labels
+
+
+def gmail_fetch_message_by_id(svc, msg_id: str, fields: str = MESSAGE_FIELDS,
+                              format_: str = "full") -> Dict[str, Any]:
     """
-    Fetch a complete Gmail message by ID.
+    Fetch a Gmail message by ID.
     
     Args:
         svc: Gmail API service object
         msg_id: Gmail message ID
+        fields: Partial-response mask (MESSAGE_FIELDS, or None for everything)
+        format_: Gmail format ("full", or "metadata" for headers without bodies)
         
     Returns:
-        Complete message dict with headers, body, etc.
+        Message dict with headers, body, etc. (limited to `fields`)
     """
-    return svc.users().messages().get(userId="me", id=msg_id, format="full").execute()
+    return svc.users().messages().get(userId="me", id=msg_id, format=format_, fields=fields).execute()
+
+
+# Sub-requests per HTTP batch call. The API accepts 100, but Gmail
+# documents that batches over 50 are likely to be rate limited
+GMAIL_BATCH_SIZE = 50
+
+
+def gmail_fetch_messages_batch(svc, msg_ids: List[str], fields: str = MESSAGE_FIELDS,
+                               format_: str = "full") -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch several Gmail messages with HTTP batch requests (one round-trip per GMAIL_BATCH_SIZE ids).
+    
+    Args:
+        svc: Gmail API service object
+        msg_ids: Gmail message IDs
+        fields/format_: As for gmail_fetch_message_by_id
+        
+    Returns:
+        Dict of message ID -> message dict. Messages that failed to fetch are
+        left out (and logged), so callers can skip them like a failed single get.
+    """
+    messages: Dict[str, Dict[str, Any]] = {}
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            logger.error("❌ Error fetching message %s: %s", request_id, exception)
+        else:
+            messages[request_id] = response
+
+    for start in range(0, len(msg_ids), GMAIL_BATCH_SIZE):
+        batch = svc.new_batch_http_request(callback=collect)
+        for msg_id in msg_ids[start:start + GMAIL_BATCH_SIZE]:
+            batch.add(
+                svc.users().messages().get(userId="me", id=msg_id, format=format_, fields=fields),
+                request_id=msg_id,
+            )
+        batch.execute()
+    return messages
 
 
 def gmail_history_list(svc, start_history_id: int) -> Dict[str, Any]:
@@ -61,7 +138,8 @@ def gmail_history_list(svc, start_history_id: int) -> Dict[str, Any]:
     return svc.users().history().list(
         userId="me", 
         startHistoryId=start_history_id,
-        historyTypes=["messageAdded"]
+        historyTypes=["messageAdded"],
+        fields=HISTORY_FIELDS
     ).execute()
 
 
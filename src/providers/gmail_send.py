@@ -1,9 +1,46 @@
 """Gmail send message functionality."""
 from typing import List, Optional, Dict, Any
 import base64
+import io
+import email.generator
 import email.mime.text
 import email.mime.multipart
-from googleapiclient.discovery import build
+
+from providers._service_cache import get_gmail_service
+
+
+def _build_raw(
+    from_addr: str,
+    to_emails: List[str],
+    cc_emails: List[str],
+    bcc_emails: List[str],
+    subject: str,
+    body_text: Optional[str],
+    body_html: Optional[str]
+) -> str:
+    """Build the MIME message and return it urlsafe-base64 encoded for the API 'raw' field."""
+    if body_html and body_text:
+        message = email.mime.multipart.MIMEMultipart('alternative')
+        message.attach(email.mime.text.MIMEText(body_text, 'plain'))
+        message.attach(email.mime.text.MIMEText(body_html, 'html'))
+    elif body_html:
+        message = email.mime.text.MIMEText(body_html, 'html')
+    else:
+        message = email.mime.text.MIMEText(body_text or "", 'plain')
+    
+    # Set headers
+    message['To'] = ', '.join(to_emails)
+    if cc_emails:
+        message['Cc'] = ', '.join(cc_emails)
+    if bcc_emails:
+        message['Bcc'] = ', '.join(bcc_emails)
+    message['Subject'] = subject
+    message['From'] = from_addr
+    
+    # Serialize straight into one buffer and encode it
+    buf = io.BytesIO()
+    email.generator.BytesGenerator(buf, mangle_from_=False).flatten(message)
+    return base64.urlsafe_b64encode(buf.getvalue()).decode('ascii')
 
 
 def gmail_send_message(
@@ -36,29 +73,9 @@ def gmail_send_message(
     if hasattr(service_or_creds, 'users'):
         service = service_or_creds
     else:
-        service = build("gmail", "v1", credentials=service_or_creds)
-    
-    # Create message
-    if body_html and body_text:
-        message = email.mime.multipart.MIMEMultipart('alternative')
-        message.attach(email.mime.text.MIMEText(body_text, 'plain'))
-        message.attach(email.mime.text.MIMEText(body_html, 'html'))
-    elif body_html:
-        message = email.mime.text.MIMEText(body_html, 'html')
-    else:
-        message = email.mime.text.MIMEText(body_text or "", 'plain')
-    
-    # Set headers
-    message['To'] = ', '.join(to_emails)
-    if cc_emails:
-        message['Cc'] = ', '.join(cc_emails)
-    if bcc_emails:
-        message['Bcc'] = ', '.join(bcc_emails)
-    message['Subject'] = subject
-    message['From'] = from_addr
+        service = get_gmail_service(service_or_creds)
     
-    # Encode message
-    raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
+    raw_message = _build_raw(from_addr, to_emails, cc_emails, bcc_emails, subject, body_text, body_html)
     
     # Send via API
     send_message = {'raw': raw_message}
@@ -83,29 +100,9 @@ def gmail_create_draft(
     if hasattr(service_or_creds, 'users'):
         service = service_or_creds
     else:
-        service = build("gmail", "v1", credentials=service_or_creds)
-    
-    # Create message (same as send)
-    if body_html and body_text:
-        message = email.mime.multipart.MIMEMultipart('alternative')
-        message.attach(email.mime.text.MIMEText(body_text, 'plain'))
-        message.attach(email.mime.text.MIMEText(body_html, 'html'))
-    elif body_html:
-        message = email.mime.text.MIMEText(body_html, 'html')
-    else:
-        message = email.mime.text.MIMEText(body_text or "", 'plain')
-    
-    # Set headers
-    message['To'] = ', '.join(to_emails)
-    if cc_emails:
-        message['Cc'] = ', '.join(cc_emails)
-    if bcc_emails:
-        message['Bcc'] = ', '.join(bcc_emails)
-    message['Subject'] = subject
-    message['From'] = from_addr
+        service = get_gmail_service(service_or_creds)
     
-    # Encode message
-    raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
+    raw_message = _build_raw(from_addr, to_emails, cc_emails, bcc_emails, subject, body_text, body_html)
     
     # Create draft via API
     draft_message = {'message': {'raw': raw_message}}
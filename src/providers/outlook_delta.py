@@ -1,68 +1,150 @@
 """Outlook Graph API delta query functions."""
-from typing import Tuple, List, Dict, Any, Optional
+import logging
+from datetime import datetime
+from typing import Generator, Tuple, List, Dict, Any, Optional
+
+import requests
+
+from providers import _json
+from providers._graph_session import get_graph_session
+
+# ijson is optional; with it delta pages are decoded one message at a time
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+except ImportError:
+    ijson = None
+
+# Per-page chatter is DEBUG so a long sync costs no formatting or stdout writes at INFO
+logger = logging.getLogger(__name__)
+
+_INITIAL_DELTA_PATH = ("/me/mailFolders/Inbox/messages/delta"
+                       "?$select=id,conversationId,from,subject,bodyPreview,receivedDateTime,body,"
+                       "toRecipients,ccRecipients,bccRecipients&$top=50")
+_DELTA_HEADERS = {
+    "Prefer": 'odata.maxpagesize=50, outlook.body-content-type="text"',
+    "Accept-Encoding": "gzip, deflate",
+}
+
+
+def _page_items(data: Dict[str, Any]) -> Generator[Dict[str, Any], None, Tuple[Optional[str], Optional[str]]]:
+    """Yield a decoded delta page's messages; return its (nextLink, deltaLink)."""
+    yield from data.get("value", [])
+    return data.get("@odata.nextLink"), data.get("@odata.deltaLink")
+
+
+def _stream_page_items(response) -> Generator[Dict[str, Any], None, Tuple[Optional[str], Optional[str]]]:
+    """_page_items straight off a stream=True response with ijson.
+
+    Each message is yielded as soon as its object closes, so the raw page
+    body is never buffered alongside its decoded form.
+    """
+    response.raw.decode_content = True  # let urllib3 undo the gzip
+    links: Dict[str, Optional[str]] = {}
+    builder = None
+    for prefix, event, value in ijson.parse(response.raw, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == "value.item" and event == "end_map":
+                yield builder.value
+                builder = None
+        elif prefix == "value.item" and event == "start_map":
+            builder = ObjectBuilder()
+            builder.event(event, value)
+        elif prefix in ("@odata.nextLink", "@odata.deltaLink") and event == "string":
+            links[prefix] = value
+    return links.get("@odata.nextLink"), links.get("@odata.deltaLink")
+
+
+def _drain(page, items: List[Dict[str, Any]]) -> Tuple[Optional[str], Optional[str]]:
+    """Append a page's messages to items; return the page's (nextLink, deltaLink)."""
+    while True:
+        try:
+            items.append(next(page))
+        except StopIteration as stop:
+            return stop.value
 
 
 def outlook_delta_list(session, delta_link: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
     Query Outlook messages using delta links for incremental sync.
+
+    With the optional ijson package and a requests session, pages are parsed
+    incrementally off the socket instead of decoding each page body at once.
     
     Args:
-        session: Authenticated requests session for Microsoft Graph API
+        session: Authenticated requests session for Microsoft Graph API (None for get_graph_session())
         delta_link: Previous delta link for incremental sync, or None for initial sync
     
     Returns:
         Tuple of (message_list, next_delta_link)
     """
+    if session is None:
+        session = get_graph_session()
+    streaming = ijson is not None and isinstance(session, requests.Session)
     if delta_link:
         url = delta_link
-        print(f"🔄 Continuing Outlook delta from: {delta_link[:100]}...")
+        logger.info("🔄 Continuing Outlook delta from: %.100s...", delta_link)
     else:
-        url = ("/me/mailFolders/Inbox/messages/delta"
-               "?$select=id,conversationId,from,subject,bodyPreview,receivedDateTime,body,"
-               "toRecipients,ccRecipients,bccRecipients&$top=50")
-        print("🆕 Starting initial Outlook delta query")
+        url = _INITIAL_DELTA_PATH
+        logger.info("🆕 Starting initial Outlook delta query")
     
-    items = []
+    items: List[Dict[str, Any]] = []
     page_count = 0
     
     while url:
         page_count += 1
-        print(f"📄 Fetching Outlook delta page {page_count}...")
+        logger.debug("📄 Fetching Outlook delta page %d...", page_count)
         
         try:
-            response = session.get(url, headers={"Prefer": "odata.maxpagesize=50"})
-            response.raise_for_status()
-            data = response.json()
-            
-            # Add items from this page
-            page_items = data.get("value", [])
-            items.extend(page_items)
-            print(f"📨 Got {len(page_items)} items from page {page_count}")
-            
-            # Check for next page or delta link
-            url = data.get("@odata.nextLink")
-            delta = data.get("@odata.deltaLink")
+            if streaming:
+                response = session.get(url, headers=_DELTA_HEADERS, stream=True)
+                response.raise_for_status()
+                page = _stream_page_items(response)
+            else:
+                response = session.get(url, headers=_DELTA_HEADERS)
+                response.raise_for_status()
+                page = _page_items(_json.loads(response.content))
+
+            # Add items from this page; the page generator returns its links
+            before = len(items)
+            try:
+                url, delta = _drain(page, items)
+            finally:
+                response.close()
+            logger.debug("📨 Got %d items from page %d", len(items) - before, page_count)
             
             if delta:
-                print(f"🎯 Found delta link, total items: {len(items)}")
+                logger.info("🎯 Found delta link, total items: %d", len(items))
                 return items, delta
                 
         except Exception as e:
-            print(f"❌ Error fetching Outlook delta page {page_count}: {e}")
+            logger.error("❌ Error fetching Outlook delta page %d: %s", page_count, e)
             raise
     
-    print(f"✅ Completed Outlook delta query: {len(items)} total items")
+    logger.info("✅ Completed Outlook delta query: %d total items", len(items))
     return items, None
 
 
 def parse_outlook_recipients(recipients_data: List[Dict[str, Any]]) -> List[str]:
     """Parse Outlook recipients array into email addresses."""
-    emails = []
-    for recipient in recipients_data or []:
-        email_addr = recipient.get("emailAddress", {}).get("address", "")
-        if email_addr:
-            emails.append(email_addr)
-    return emails
+    return [addr for r in recipients_data or ()
+            if (addr := (r.get("emailAddress") or {}).get("address"))]
+
+
+def _parse_received(received_str: Optional[str]) -> Optional[datetime]:
+    """Graph receivedDateTime ("2024-05-01T12:34:56Z") -> aware datetime, None if unparseable."""
+    if not received_str:
+        return None
+    try:
+        # Python 3.11+ reads the trailing Z directly
+        return datetime.fromisoformat(received_str)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(received_str.replace("Z", "+00:00"))
+    except ValueError:
+        return None
 
 
 def to_normalized_outlook(outlook_msg: Dict[str, Any]) -> Dict[str, Any]:
@@ -93,15 +175,6 @@ def to_normalized_outlook(outlook_msg: Dict[str, Any]) -> Dict[str, Any]:
     body_text = body_content if body_type == "text" else ""
     body_html = body_content if body_type == "html" else ""
     
-    # Parse date
-    received_at = None
-    received_str = outlook_msg.get("receivedDateTime")
-    if received_str:
-        try:
-            from datetime import datetime
-            received_at = datetime.fromisoformat(received_str.replace("Z", "+00:00"))
-        except:
-            pass
     
     return {
         "id": outlook_msg["id"],
@@ -116,5 +189,5 @@ def to_normalized_outlook(outlook_msg: Dict[str, Any]) -> Dict[str, Any]:
         "snippet": outlook_msg.get("bodyPreview", ""),
         "body_text": body_text,
         "body_html": body_html,
-        "received_at": received_at,
+        "received_at": _parse_received(outlook_msg.get("receivedDateTime")),
     }
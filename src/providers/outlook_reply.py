@@ -12,41 +12,51 @@ conversation threading in Outlook.
 """
 
 import requests
+from urllib.parse import quote
 from typing import List, Optional, Dict, Any
 
+from providers import _json
+from providers._graph_recipients import graph_recipients
+from providers._graph_session import get_graph_session
 
-def _addr_obj(email: str) -> Dict[str, Any]:
-    """Convert email address to Graph API recipient object."""
-    return {"emailAddress": {"address": email}}
+_FIND_SELECT = "id,subject,internetMessageId,from,replyTo"
+# Only the Message-ID varies between lookups; the rest of the URL is fixed
+_FIND_URL_TMPL = "/me/messages?$select=" + _FIND_SELECT + "&$filter=internetMessageId%20eq%20%27{}%27"
 
 
-def find_message_by_internet_id(session: requests.Session, internet_message_id: str) -> Optional[Dict[str, Any]]:
+def _find_url(internet_message_id: str) -> str:
+    """Relative /me/messages URL that filters on one exact internetMessageId."""
+    # IMPORTANT: internetMessageId must be quoted exactly with angle brackets if present
+    # Example filter: internetMessageId eq '<abcdefg@mail.byu.edu>'
+    # (a quote inside the id is doubled, per OData string literal rules)
+    return _FIND_URL_TMPL.format(quote(internet_message_id.replace("'", "''"), safe=""))
+
+
+def find_message_by_internet_id(session: Optional[requests.Session], internet_message_id: str) -> Optional[Dict[str, Any]]:
     """
     Search the user's mailbox for a message with the exact internetMessageId.
     
     Args:
-        session: Pre-authenticated Graph session (base URL should be https://graph.microsoft.com/v1.0)
+        session: Pre-authenticated Graph session (base URL should be https://graph.microsoft.com/v1.0),
+            or None for the shared get_graph_session()
         internet_message_id: The Message-ID header value (including angle brackets if present)
         
     Returns:
         The message object if found, None otherwise
     """
-    # IMPORTANT: internetMessageId must be quoted exactly with angle brackets if present
-    # Example filter: internetMessageId eq '<abcdefg@mail.byu.edu>'
-    filter_expr = f"internetMessageId eq '{internet_message_id}'"
-    url = f"/me/messages?$select=id,subject,internetMessageId&$filter={requests.utils.quote(filter_expr, safe='=$\'?&')}"
-    
+    if session is None:
+        session = get_graph_session()
     try:
-        r = session.get(url, timeout=15)
+        r = session.get(_find_url(internet_message_id), timeout=15)
         r.raise_for_status()
-        items = r.json().get("value", [])
+        items = _json.loads(r.content).get("value", [])
         return items[0] if items else None
     except Exception as e:
         print(f"❌ Error searching for message by internetMessageId '{internet_message_id}': {e}")
         return None
 
 
-def create_reply_draft(session: requests.Session, message_id: str) -> Optional[Dict[str, Any]]:
+def create_reply_draft(session: Optional[requests.Session], message_id: str) -> Optional[Dict[str, Any]]:
     """
     Create a reply draft (so we can edit recipients and body).
     
@@ -57,11 +67,13 @@ def create_reply_draft(session: requests.Session, message_id: str) -> Optional[D
     Returns:
         The new draft message object containing 'id', or None if failed
     """
+    if session is None:
+        session = get_graph_session()
     try:
         r = session.post(f"/me/messages/{message_id}/createReply", timeout=15)
         # Some tenants return 201 with message; some 202 with no body — handle both:
         if r.status_code in (200, 201):
-            msg = r.json()
+            msg = _json.loads(r.content)
             return msg  # contains 'id'
         elif r.status_code == 202:
             # Draft created but no body returned - this is normal for some Graph setups
@@ -76,7 +88,7 @@ def create_reply_draft(session: requests.Session, message_id: str) -> Optional[D
         return None
 
 
-def update_draft(session: requests.Session, draft_id: str,
+def update_draft(session: Optional[requests.Session], draft_id: str,
                  body_text: str,
                  to: List[str], cc: List[str], bcc: List[str]) -> bool:
     """
@@ -93,15 +105,17 @@ def update_draft(session: requests.Session, draft_id: str,
     Returns:
         True if successful, False otherwise
     """
+    if session is None:
+        session = get_graph_session()
     payload = {
         "subject": None,  # keep Outlook's default "Re: ..."
         "body": {
             "contentType": "Text",
             "content": body_text or ""
         },
-        "toRecipients":  [_addr_obj(x) for x in to]  if to  else [],
-        "ccRecipients":  [_addr_obj(x) for x in cc]  if cc  else [],
-        "bccRecipients": [_addr_obj(x) for x in bcc] if bcc else [],
+        "toRecipients":  graph_recipients(to),
+        "ccRecipients":  graph_recipients(cc),
+        "bccRecipients": graph_recipients(bcc),
     }
     
     try:
@@ -113,7 +127,7 @@ def update_draft(session: requests.Session, draft_id: str,
         return False
 
 
-def send_draft(session: requests.Session, draft_id: str) -> bool:
+def send_draft(session: Optional[requests.Session], draft_id: str) -> bool:
     """
     Send the draft message.
     
@@ -124,6 +138,8 @@ def send_draft(session: requests.Session, draft_id: str) -> bool:
     Returns:
         True if successful, False otherwise
     """
+    if session is None:
+        session = get_graph_session()
     try:
         r = session.post(f"/me/messages/{draft_id}/send", timeout=15)
         r.raise_for_status()
@@ -133,13 +149,48 @@ def send_draft(session: requests.Session, draft_id: str) -> bool:
         return False
 
 
-def reply_via_outlook_session(session: requests.Session,
+def _default_reply_address(msg: Dict[str, Any]) -> Optional[str]:
+    """Where Graph's /reply sends to: the single Reply-To, else the sender (None if ambiguous)."""
+    reply_to = msg.get("replyTo") or []
+    if len(reply_to) > 1:
+        return None
+    sender = reply_to[0] if reply_to else msg.get("from") or {}
+    return (sender.get("emailAddress") or {}).get("address")
+
+
+def send_reply(session: Optional[requests.Session], message_id: str, body_text: str) -> bool:
+    """
+    Reply to the original's sender in one call (Graph /reply), no draft round-trips.
+
+    Args:
+        session: Pre-authenticated Graph session
+        message_id: The original message's Graph ID
+        body_text: Reply text; Graph puts it above the quoted original
+
+    Returns:
+        True if successful, False otherwise
+    """
+    if session is None:
+        session = get_graph_session()
+    try:
+        r = session.post(f"/me/messages/{message_id}/reply", json={"comment": body_text or ""}, timeout=15)
+        r.raise_for_status()
+        return True
+    except Exception as e:
+        print(f"❌ Error replying to message '{message_id}': {e}")
+        return False
+
+
+def reply_via_outlook_session(session: Optional[requests.Session],
                               internet_message_id: str,
                               reply_body_text: str,
                               to: List[str], cc: List[str], bcc: List[str]) -> str:
     """
     High-level convenience: find original by internetMessageId, create reply draft,
     update with your body/recipients, and send.
+
+    When the reply goes only to the address Graph would pick anyway (no CC/BCC),
+    it is sent with a single /reply call instead of the three draft steps.
     
     Args:
         session: Pre-authenticated Graph session
@@ -152,6 +203,8 @@ def reply_via_outlook_session(session: requests.Session,
     Returns:
         Status string: "sent", "not_found", "draft_create_failed", "update_failed", "send_failed"
     """
+    if session is None:
+        session = get_graph_session()
     print(f"🔍 Searching for Outlook message with internetMessageId: {internet_message_id}")
     
     found = find_message_by_internet_id(session, internet_message_id)
@@ -162,6 +215,14 @@ def reply_via_outlook_session(session: requests.Session,
     orig_id = found["id"]
     print(f"✅ Found Outlook message: {found.get('subject', 'No Subject')} (ID: {orig_id})")
     
+    default_to = _default_reply_address(found)
+    if (not cc and not bcc and default_to and len(to) == 1
+            and to[0].lower() == default_to.lower()):
+        if not send_reply(session, orig_id, reply_body_text):
+            return "send_failed"
+        print(f"📤 Successfully sent reply via Outlook")
+        return "sent"
+    
     draft = create_reply_draft(session, orig_id)
     if not draft or "id" not in draft:
         print(f"❌ Failed to create reply draft for message: {orig_id}")
@@ -1,6 +1,38 @@
 """Outlook send message functionality."""
 from typing import List, Optional, Dict, Any
 
+from providers import _json
+from providers._graph_recipients import graph_recipients
+from providers._graph_session import get_graph_session
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _build_message(
+    subject: str,
+    to_emails: List[str],
+    cc_emails: List[str],
+    bcc_emails: List[str],
+    body_text: Optional[str],
+    body_html: Optional[str]
+) -> Dict[str, Any]:
+    """Graph message resource shared by sendMail and draft creation."""
+    # HTML wins when both bodies are given
+    if body_html:
+        body = {"contentType": "HTML", "content": body_html}
+    else:
+        body = {"contentType": "Text", "content": body_text or ""}
+    message = {
+        "subject": subject,
+        "body": body,
+        "toRecipients": graph_recipients(to_emails)
+    }
+    if cc_emails:
+        message["ccRecipients"] = graph_recipients(cc_emails)
+    if bcc_emails:
+        message["bccRecipients"] = graph_recipients(bcc_emails)
+    return message
+
 
 def outlook_send_mail(
     session,
@@ -16,7 +48,7 @@ def outlook_send_mail(
     Send an email via Microsoft Graph API.
     
     Args:
-        session: Authenticated requests session for Microsoft Graph
+        session: Authenticated requests session for Microsoft Graph (None for get_graph_session())
         from_addr: Sender email address (used for display only)
         to_emails: List of recipient email addresses
         cc_emails: List of CC email addresses
@@ -28,43 +60,21 @@ def outlook_send_mail(
     Returns:
         Dict with sent message info
     """
-    # Build recipients
-    def build_recipients(email_list):
-        return [{"emailAddress": {"address": email}} for email in email_list]
-    
-    # Determine body content and type
-    if body_html:
-        body_content = body_html
-        content_type = "HTML"
-    else:
-        body_content = body_text or ""
-        content_type = "Text"
-    
-    # Build message payload
-    message = {
-        "subject": subject,
-        "body": {
-            "contentType": content_type,
-            "content": body_content
-        },
-        "toRecipients": build_recipients(to_emails)
-    }
-    
-    if cc_emails:
-        message["ccRecipients"] = build_recipients(cc_emails)
-    
-    if bcc_emails:
-        message["bccRecipients"] = build_recipients(bcc_emails)
+    if session is None:
+        session = get_graph_session()
+    message = _build_message(subject, to_emails, cc_emails, bcc_emails, body_text, body_html)
     
     # Send via Graph API
-    response = session.post("/me/sendMail", json={"message": message})
+    response = session.post("/me/sendMail", data=_json.dumps({"message": message}), headers=_JSON_HEADERS, timeout=15)
     response.raise_for_status()
     
     print(f"✅ Outlook message sent via Graph API")
     
-    # Graph API returns 202 with no content for successful sends
+    # Graph API returns 202 with no content for successful sends, so the id is
+    # only a per-process tag (str hashes are salted); hashing the tuple avoids
+    # building subject + repr(to_emails) strings
     return {
-        "id": "outlook_sent_" + str(hash(subject + str(to_emails))),
+        "id": f"outlook_sent_{hash((subject, *to_emails)) & 0xFFFFFFFFFFFFFFFF:x}",
         "status": "sent"
     }
 
@@ -80,38 +90,14 @@ def outlook_create_draft(
     body_html: Optional[str]
 ) -> Dict[str, Any]:
     """Create an Outlook draft via Microsoft Graph API."""
-    # Build recipients
-    def build_recipients(email_list):
-        return [{"emailAddress": {"address": email}} for email in email_list]
-    
-    # Determine body content and type
-    if body_html:
-        body_content = body_html
-        content_type = "HTML"
-    else:
-        body_content = body_text or ""
-        content_type = "Text"
-    
-    # Build message payload
-    message = {
-        "subject": subject,
-        "body": {
-            "contentType": content_type,
-            "content": body_content
-        },
-        "toRecipients": build_recipients(to_emails)
-    }
-    
-    if cc_emails:
-        message["ccRecipients"] = build_recipients(cc_emails)
-    
-    if bcc_emails:
-        message["bccRecipients"] = build_recipients(bcc_emails)
+    if session is None:
+        session = get_graph_session()
+    message = _build_message(subject, to_emails, cc_emails, bcc_emails, body_text, body_html)
     
     # Create draft via Graph API
-    response = session.post("/me/messages", json=message)
+    response = session.post("/me/messages", data=_json.dumps(message), headers=_JSON_HEADERS, timeout=15)
     response.raise_for_status()
-    result = response.json()
+    result = _json.loads(response.content)
     
     print(f"📝 Outlook draft created: {result.get('id')}")
     return result
@@ -0,0 +1,4 @@
+"""Legacy import path for EmailRepo; the implementation lives in services.email.email_repo."""
+from services.email.email_repo import EmailRepo, create_outbound_draft, mark_outbound_sent
+
+__all__ = ["EmailRepo", "create_outbound_draft", "mark_outbound_sent"]
@@ -1,7 +1,6 @@
 """Repository for managing push webhook and delta state."""
 from typing import Optional
 import sys
-import os
 import pathlib
 
 # Add project root to path  
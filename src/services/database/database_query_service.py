@@ -2,11 +2,9 @@
 Database Query Service for LLM
 Provides safe database access for the LLM to answer questions about emails and data
 """
-import os
 import sys
 import pathlib
-from typing import List, Dict, Any, Optional, Tuple
-import json
+from typing import List, Dict, Any, Tuple
 import re
 from datetime import datetime, timedelta
 
@@ -1,13 +1,20 @@
 """Repository for managing email contacts."""
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple
 import sys
 import pathlib
+import time
 
 # Add project root to path
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
 
 from core.database import get_conn
 
+# "find john" is often repeated within a compose session:
+# (lowercased query, limit) -> (monotonic timestamp, results)
+SEARCH_CACHE_TTL = 120.0
+SEARCH_CACHE_MAXSIZE = 1024
+_SEARCH_CACHE: Dict[Tuple[str, int], Tuple[float, List[Tuple[int, str, str]]]] = {}
+
 
 class ContactsRepo:
     """Repository for managing email contacts and recipients."""
@@ -23,9 +30,15 @@ class ContactsRepo:
         Returns:
             List of tuples: (id, name, email)
         """
+        key = (query.lower(), limit)
+        cached = _SEARCH_CACHE.get(key)
+        if cached and time.monotonic() - cached[0] < SEARCH_CACHE_TTL:
+            return cached[1]
+
         with get_conn() as conn, conn.cursor() as cur:
-            # Search in email_messages for frequent contacts
-            search_term = f"%{query.lower()}%"
+            # Search in email_messages for frequent contacts; one predicate over
+            # name + address so the pg_trgm index (see migrations) serves '%q%'
+            search_term = f"%{key[0]}%"
             cur.execute("""
                 SELECT 
                     ROW_NUMBER() OVER (ORDER BY email_count DESC) as id,
@@ -37,16 +50,22 @@ class ContactsRepo:
                         from_email,
                         COUNT(*) as email_count
                     FROM email_messages 
-                    WHERE (LOWER(from_display) LIKE %s OR LOWER(from_email) LIKE %s)
+                    WHERE lower(COALESCE(from_display, '') || ' ' || from_email) LIKE %s
                       AND from_email IS NOT NULL 
                       AND from_email != ''
                     GROUP BY from_display, from_email
                 ) subq
                 ORDER BY email_count DESC
                 LIMIT %s
-            """, (search_term, search_term, limit))
+            """, (search_term, limit))
             
-            return cur.fetchall()
+            results = cur.fetchall()
+
+        if len(_SEARCH_CACHE) >= SEARCH_CACHE_MAXSIZE:
+            # Drop the oldest entry (dicts keep insertion order)
+            _SEARCH_CACHE.pop(next(iter(_SEARCH_CACHE)))
+        _SEARCH_CACHE[key] = (time.monotonic(), results)
+        return results
     
     def get_frequent_contacts(self, limit: int = 20) -> List[Tuple[int, str, str]]:
         """Get most frequent email contacts."""
@@ -79,6 +98,7 @@ class ContactsRepo:
         """Add a new contact (for future use)."""
         # For now, just return a placeholder ID
         # In the future, you might want a dedicated contacts table
+        _SEARCH_CACHE.clear()
         return 1
 
 
@@ -2,15 +2,69 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional, Sequence
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import sys
-import os
 import pathlib
+import time
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
 
+from psycopg.rows import dict_row
+
 from core.database import get_conn
 
+# Full get_email_detail rows for repeat More/Reply presses on the same email
+EMAIL_DETAIL_CACHE_TTL = 60.0
+EMAIL_DETAIL_CACHE_MAXSIZE = 2048
+_EMAIL_DETAIL_CACHE: Dict[int, Tuple[float, dict]] = {}
+
+
+def _text_array(values: Optional[Sequence[str]]) -> list:
+    """Parameter for a text[] column: lists pass through uncopied.
+
+    psycopg adapts only lists to arrays (a tuple would be sent as a record),
+    so other sequences still get converted, but the common list case no
+    longer pays for a copy.
+    """
+    return values if type(values) is list else list(values or ())
+
+
+def _invalidate_email(email_id: int) -> None:
+    """Drop cached rows for one email after a write"""
+    _EMAIL_DETAIL_CACHE.pop(email_id, None)
+
+
+def _invalidate_all() -> None:
+    _EMAIL_DETAIL_CACHE.clear()
+
+
+_EMAIL_COLUMNS = """
+      provider, provider_message_id, thread_id,
+      from_display, from_email, to_emails, cc_emails, bcc_emails,
+      subject, snippet, body_plain, body_html,
+      received_at, tags, internet_message_id, references_ids
+"""
+
+_INSERT_EMAIL_SQL = """
+    INSERT INTO email_messages (""" + _EMAIL_COLUMNS + """)
+    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+    ON CONFLICT (provider, provider_message_id) DO NOTHING
+"""
+
+# Batches at least this big are loaded with COPY into a temp table and merged
+# with one INSERT ... SELECT; below it the CREATE/COPY overhead isn't worth it
+COPY_MIN_ROWS = 200
+
+# Insert-or-fetch in one statement: the new row's id, or on conflict the
+# existing row's id (the outer SELECT can't see m's row, hence NOT EXISTS)
+_UPSERT_EMAIL_ID_SQL = """
+    WITH m AS (""" + _INSERT_EMAIL_SQL + """ RETURNING id)
+    SELECT id FROM m
+    UNION ALL
+    SELECT id FROM email_messages
+     WHERE provider = %s AND provider_message_id = %s AND NOT EXISTS (SELECT 1 FROM m)
+"""
+
 
 class EmailRepo:
     """Repository for email-related database operations"""
@@ -43,45 +97,105 @@ class EmailRepo:
     def upsert_thread(self, provider: str, provider_thread_id: str, subject_last: Optional[str]) -> int:
         """Insert or update an email thread and return its internal ID."""
         with get_conn() as conn, conn.cursor() as cur:
-            # First, check if a thread with this provider_thread_id exists
-            cur.execute("""
-                SELECT id, subject_last FROM email_threads 
-                WHERE provider = %s AND provider_thread_id = %s
-            """, (provider, provider_thread_id))
-            
-            existing = cur.fetchone()
-            if existing:
-                thread_id, existing_subject = existing
-                # Only update if subjects are similar or related
-                if existing_subject and subject_last:
-                    # Check if this is truly the same thread or a thread ID reuse
-                    # If subjects are completely different, create a new thread with modified ID
-                    if not self._subjects_are_related(existing_subject, subject_last):
-                        # Create a new unique thread ID to avoid conflicts
-                        import time
-                        new_thread_id = f"{provider_thread_id}_{int(time.time())}"
-                        cur.execute("""
-                            INSERT INTO email_threads (provider, provider_thread_id, subject_last)
-                            VALUES (%s, %s, %s)
-                            RETURNING id;
-                        """, (provider, new_thread_id, subject_last))
-                        return cur.fetchone()[0]
-                
-                # Update existing thread with new subject if needed
-                if subject_last and subject_last != existing_subject:
+            return self._upsert_thread(cur, provider, provider_thread_id, subject_last)
+
+    def _upsert_thread(self, cur, provider: str, provider_thread_id: str, subject_last: Optional[str]) -> int:
+        """upsert_thread on an open cursor, so callers can batch several in one transaction"""
+        # First, check if a thread with this provider_thread_id exists
+        cur.execute("""
+            SELECT id, subject_last FROM email_threads 
+            WHERE provider = %s AND provider_thread_id = %s
+        """, (provider, provider_thread_id), prepare=True)
+        
+        existing = cur.fetchone()
+        if existing:
+            thread_id, existing_subject = existing
+            # Only update if subjects are similar or related
+            if existing_subject and subject_last:
+                # Check if this is truly the same thread or a thread ID reuse
+                # If subjects are completely different, create a new thread with modified ID
+                if not self._subjects_are_related(existing_subject, subject_last):
+                    # Create a new unique thread ID to avoid conflicts
+                    new_thread_id = f"{provider_thread_id}_{int(time.time())}"
                     cur.execute("""
-                        UPDATE email_threads SET subject_last = %s, updated_at = NOW()
-                        WHERE id = %s
-                    """, (subject_last, thread_id))
-                return thread_id
-            else:
-                # Insert new thread
+                        INSERT INTO email_threads (provider, provider_thread_id, subject_last)
+                        VALUES (%s, %s, %s)
+                        RETURNING id;
+                    """, (provider, new_thread_id, subject_last))
+                    return cur.fetchone()[0]
+            
+            # Update existing thread with new subject if needed
+            if subject_last and subject_last != existing_subject:
                 cur.execute("""
-                    INSERT INTO email_threads (provider, provider_thread_id, subject_last)
-                    VALUES (%s, %s, %s)
-                    RETURNING id;
-                """, (provider, provider_thread_id, subject_last))
-                return cur.fetchone()[0]
+                    UPDATE email_threads SET subject_last = %s, updated_at = NOW()
+                    WHERE id = %s
+                """, (subject_last, thread_id))
+            return thread_id
+        else:
+            # Insert new thread
+            cur.execute("""
+                INSERT INTO email_threads (provider, provider_thread_id, subject_last)
+                VALUES (%s, %s, %s)
+                RETURNING id;
+            """, (provider, provider_thread_id, subject_last))
+            return cur.fetchone()[0]
+
+    def _upsert_threads(self, cur, threads: Sequence[Tuple[str, str, Optional[str]]]) -> List[int]:
+        """_upsert_thread for many (provider, provider_thread_id, subject) tuples; ids in input order.
+
+        Same outcome as calling _upsert_thread for each tuple in turn, but in at
+        most three statements: one lookup of the existing threads, one INSERT
+        for the new ones and one UPDATE for changed subjects.
+        """
+        keys = list(dict.fromkeys((t[0], t[1]) for t in threads))
+        cur.execute("""
+            SELECT provider, provider_thread_id, id, subject_last FROM email_threads
+             WHERE (provider, provider_thread_id) IN (
+                   SELECT * FROM unnest(%s::text[], %s::text[]))
+        """, ([k[0] for k in keys], [k[1] for k in keys]))
+        # (provider, provider_thread_id) -> [id (None until inserted), subject_last]
+        state = {(prov, ptid): [tid, subj] for prov, ptid, tid, subj in cur.fetchall()}
+
+        refs = []
+        new_threads: Dict[Tuple[str, str], Optional[str]] = {}
+        updates: Dict[int, str] = {}
+        for provider, provider_thread_id, subject in threads:
+            key = (provider, provider_thread_id)
+            current = state.get(key)
+            if current is None:
+                state[key] = [None, subject]
+                new_threads[key] = subject
+            elif current[1] and subject and not self._subjects_are_related(current[1], subject):
+                # Thread id reused for an unrelated conversation: split it off
+                key = (provider, f"{provider_thread_id}_{int(time.time())}")
+                state.setdefault(key, [None, subject])
+                new_threads.setdefault(key, subject)
+            elif subject and subject != current[1]:
+                current[1] = subject
+                if current[0] is None:
+                    new_threads[key] = subject
+                else:
+                    updates[current[0]] = subject
+            refs.append(key)
+
+        if new_threads:
+            cur.execute("""
+                INSERT INTO email_threads (provider, provider_thread_id, subject_last)
+                SELECT * FROM unnest(%s::text[], %s::text[], %s::text[])
+                ON CONFLICT (provider, provider_thread_id)
+                DO UPDATE SET subject_last = COALESCE(EXCLUDED.subject_last, email_threads.subject_last),
+                              updated_at = NOW()
+                RETURNING provider, provider_thread_id, id
+            """, ([k[0] for k in new_threads], [k[1] for k in new_threads], list(new_threads.values())))
+            for prov, ptid, tid in cur.fetchall():
+                state[(prov, ptid)][0] = tid
+        if updates:
+            cur.execute("""
+                UPDATE email_threads t SET subject_last = u.subject_last, updated_at = NOW()
+                  FROM unnest(%s::bigint[], %s::text[]) AS u(id, subject_last)
+                 WHERE t.id = u.id
+            """, (list(updates), list(updates.values())))
+        return [state[key][0] for key in refs]
 
     def upsert_email(self, provider: str, provider_message_id: str, provider_thread_id: str,
                      from_display: Optional[str], from_email: Optional[str],
@@ -92,24 +206,75 @@ class EmailRepo:
                      internet_message_id: Optional[str] = None,
                      references_ids: Optional[Sequence[str]] = None) -> int:
         """Insert or update an inbound email message and return its internal ID."""
-        thread_id = self.upsert_thread(provider, provider_thread_id, subject)
+        # Thread and message share one connection/transaction, and the message
+        # insert returns the existing id on conflict without a follow-up query.
+        # Both hot statements are prepared server-side on first use; pooled
+        # connections (core.database) keep the plans across calls
         with get_conn() as conn, conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO email_messages (
-                  provider, provider_message_id, thread_id,
-                  from_display, from_email, to_emails, cc_emails, bcc_emails,
+            thread_id = self._upsert_thread(cur, provider, provider_thread_id, subject)
+            cur.execute(_UPSERT_EMAIL_ID_SQL, (provider, provider_message_id, thread_id,
+                  from_display, from_email, _text_array(to_emails), _text_array(cc_emails), _text_array(bcc_emails),
                   subject, snippet, body_plain, body_html,
-                  received_at, tags, internet_message_id, references_ids
-                )
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                ON CONFLICT (provider, provider_message_id) DO NOTHING
-                RETURNING id;
-            """, (provider, provider_message_id, thread_id,
-                  from_display, from_email, list(to_emails), list(cc_emails), list(bcc_emails),
-                  subject, snippet, body_plain, body_html,
-                  received_at, list(tags), internet_message_id, list(references_ids or [])))
+                  received_at, _text_array(tags), internet_message_id, _text_array(references_ids),
+                  provider, provider_message_id), prepare=True)
+            row = cur.fetchone()
+            if row:
+                return row[0]
+            # Lost a race with a concurrent insert not yet visible to this statement's snapshot
+            cur.execute("SELECT id FROM email_messages WHERE provider=%s AND provider_message_id=%s",
+                        (provider, provider_message_id))
             row = cur.fetchone()
-            return row[0] if row else self.get_email_id(provider, provider_message_id)
+            return row[0] if row else None
+
+    def upsert_email_many(self, rows: Sequence[dict]) -> List[int]:
+        """Insert many inbound emails in one transaction; return their IDs in row order.
+
+        Each row takes the same keys as upsert_email's arguments. Threads are
+        resolved set-wise first (_upsert_threads), then every message goes in
+        with a single executemany (COPY for backfill-sized batches); existing
+        messages are left alone and their current IDs returned. A batch costs
+        a fixed handful of statements rather than a few per row.
+        """
+        if not rows:
+            return []
+        with get_conn() as conn, conn.cursor() as cur:
+            thread_ids = self._upsert_threads(
+                cur, [(r["provider"], r["provider_thread_id"], r.get("subject")) for r in rows])
+            params = [
+                (r["provider"], r["provider_message_id"], thread_id,
+                 r.get("from_display"), r.get("from_email"),
+                 _text_array(r.get("to_emails")), _text_array(r.get("cc_emails")), _text_array(r.get("bcc_emails")),
+                 r.get("subject"), r.get("snippet"), r.get("body_plain"), r.get("body_html"),
+                 r.get("received_at"), _text_array(r.get("tags")),
+                 r.get("internet_message_id"), _text_array(r.get("references_ids")))
+                for r, thread_id in zip(rows, thread_ids)
+            ]
+            if len(params) >= COPY_MIN_ROWS:
+                self._copy_emails(cur, params)
+            else:
+                cur.executemany(_INSERT_EMAIL_SQL, params)
+            # One lookup covers both fresh inserts and conflicts
+            cur.execute("""
+                SELECT provider, provider_message_id, id FROM email_messages
+                 WHERE (provider, provider_message_id) IN (
+                       SELECT * FROM unnest(%s::text[], %s::text[]))
+            """, ([p[0] for p in params], [p[1] for p in params]))
+            ids = {(prov, mid): eid for prov, mid, eid in cur.fetchall()}
+            return [ids[(p[0], p[1])] for p in params]
+
+    def _copy_emails(self, cur, params: Sequence[tuple]) -> None:
+        """Bulk-insert _INSERT_EMAIL_SQL parameter tuples via COPY, skipping existing messages.
+
+        COPY can't express ON CONFLICT, so rows land in a transaction-scoped
+        staging table first and are merged from there.
+        """
+        cur.execute("CREATE TEMP TABLE staging_emails ON COMMIT DROP AS SELECT"
+                    + _EMAIL_COLUMNS + "FROM email_messages WITH NO DATA")
+        with cur.copy("COPY staging_emails (" + _EMAIL_COLUMNS + ") FROM STDIN") as copy:
+            for row in params:
+                copy.write_row(row)
+        cur.execute("INSERT INTO email_messages (" + _EMAIL_COLUMNS + ") SELECT" + _EMAIL_COLUMNS
+                    + "FROM staging_emails ON CONFLICT (provider, provider_message_id) DO NOTHING")
 
     def get_email_id(self, provider: str, provider_message_id: str) -> Optional[int]:
         """Get the internal ID for an email by provider and message ID."""
@@ -135,7 +300,8 @@ class EmailRepo:
 
     def get_recent_emails(self, provider: Optional[str] = None, limit: int = 50) -> List[dict]:
         """Get recent emails, optionally filtered by provider."""
-        with get_conn() as conn, conn.cursor() as cur:
+        # dict_row builds each result dict while decoding, no second pass over the rows
+        with get_conn() as conn, conn.cursor(row_factory=dict_row) as cur:
             if provider:
                 cur.execute("""
                     SELECT id, provider, from_display, from_email, subject, received_at, snippet 
@@ -151,20 +317,7 @@ class EmailRepo:
                     ORDER BY received_at DESC, id DESC 
                     LIMIT %s
                 """, (limit,))
-            
-            rows = cur.fetchall()
-            return [
-                {
-                    "id": row[0],
-                    "provider": row[1],
-                    "from_display": row[2],
-                    "from_email": row[3], 
-                    "subject": row[4],
-                    "received_at": row[5],
-                    "snippet": row[6]
-                }
-                for row in rows
-            ]
+            return cur.fetchall()
 
     # New methods for telegram digest functionality
     def mark_important(self, email_id: int) -> None:
@@ -175,6 +328,7 @@ class EmailRepo:
                 SET tags = ARRAY_APPEND(tags, 'important')
                 WHERE id = %s AND NOT ('important' = ANY(tags))
             """, (email_id,))
+        _invalidate_email(email_id)
 
     # ---- Notification helpers ----
     def mark_notified(self, email_id: int) -> None:
@@ -189,13 +343,32 @@ class EmailRepo:
                 """,
                 (email_id,),
             )
+        _invalidate_email(email_id)
+
+    def mark_notified_many(self, email_ids: Sequence[int]) -> None:
+        """mark_notified for many emails in one UPDATE (one round-trip, one transaction)."""
+        if not email_ids:
+            return
+        ids = list(email_ids)
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE email_messages
+                   SET tags = ARRAY_APPEND(tags, 'notified'),
+                       last_accessed_at = NOW()
+                 WHERE id = ANY(%s) AND NOT ('notified' = ANY(tags))
+                """,
+                (ids,),
+            )
+        for email_id in ids:
+            _invalidate_email(email_id)
 
     def list_recent_unnotified(self, since_hours: int = 24, limit: int = 50) -> List[dict]:
         """Return recent inbound emails missing the 'notified' tag."""
         with get_conn() as conn, conn.cursor() as cur:
             cur.execute(
                 """
-                SELECT em.id, em.provider, em.from_display, em.from_email,
+                SELECT em.id, em.provider, em.from_display, COALESCE(em.from_email, '') AS from_email,
                        em.subject, em.snippet, em.received_at
                   FROM email_messages em
                  WHERE em.direction = 'inbound'
@@ -229,6 +402,62 @@ class EmailRepo:
                 WHERE id = %s
             """, (email_id,))
 
+    def get_email_badges_bulk(self, ids: Sequence[int], byu_label: str,
+                              business_email: Optional[str] = None,
+                              business_domain: Optional[str] = None) -> Dict[int, str]:
+        """Classify many emails into digest badges in one query.
+
+        Same priority as the digest's rules: 🎓 when tagged with byu_label, 💼 when
+        any party matches the business mailbox/domain, otherwise 🏠. Only the
+        badge travels back, not the address/tag arrays.
+        """
+        if not ids:
+            return {}
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT id,
+                  CASE
+                    WHEN %(byu_label)s = ANY(tags) THEN '🎓'
+                    WHEN EXISTS (
+                      SELECT 1 FROM unnest(
+                        COALESCE(to_emails, '{}') || COALESCE(cc_emails, '{}')
+                        || COALESCE(bcc_emails, '{}') || ARRAY[from_email]
+                      ) AS a
+                      WHERE lower(a) = %(biz_email)s
+                         OR right(lower(a), length(%(biz_suffix)s::text)) = %(biz_suffix)s
+                    ) THEN '💼'
+                    ELSE '🏠'
+                  END AS badge
+                FROM email_messages
+                WHERE id = ANY(%(ids)s)
+            """, {
+                "ids": list(ids),
+                "byu_label": byu_label,
+                # NULL never matches, so an unset business rule is skipped
+                "biz_email": business_email.lower() if business_email else None,
+                # Compared as a plain suffix, so _ and % in the domain aren't wildcards
+                "biz_suffix": f"@{business_domain.lower()}" if business_domain else None,
+            })
+            return {row[0]: row[1] for row in cur.fetchall()}
+
+    def get_email_detail_cached(self, email_id: int) -> Optional[dict]:
+        """get_email_detail memoized for EMAIL_DETAIL_CACHE_TTL seconds.
+
+        The returned dict is shared between callers; treat it as read-only.
+        """
+        now = time.monotonic()
+        cached = _EMAIL_DETAIL_CACHE.get(email_id)
+        if cached and now - cached[0] < EMAIL_DETAIL_CACHE_TTL:
+            return cached[1]
+
+        detail = self.get_email_detail(email_id)
+        if detail is not None:
+            if len(_EMAIL_DETAIL_CACHE) >= EMAIL_DETAIL_CACHE_MAXSIZE:
+                # Drop the oldest entry (dicts keep insertion order)
+                _EMAIL_DETAIL_CACHE.pop(next(iter(_EMAIL_DETAIL_CACHE)))
+            _EMAIL_DETAIL_CACHE[email_id] = (now, detail)
+        return detail
+
     def get_email_detail(self, email_id: int) -> Optional[dict]:
         """Get detailed email information by ID."""
         with get_conn() as conn, conn.cursor() as cur:
@@ -293,7 +522,7 @@ class EmailRepo:
         """Get latest new messages for digest."""
         with get_conn() as conn, conn.cursor() as cur:
             cur.execute("""
-                SELECT em.id, em.provider, em.from_display, em.from_email, 
+                SELECT em.id, em.provider, em.from_display, COALESCE(em.from_email, '') AS from_email,
                        em.subject, em.snippet, em.received_at,
                        et.provider_thread_id
                 FROM email_messages em
@@ -327,6 +556,8 @@ class EmailRepo:
                 SET deleted_at = NOW()
                 WHERE provider = %s AND provider_thread_id = %s
             """, (provider, provider_thread_id))
+        # Message ids of the thread aren't known here; drop everything
+        _invalidate_all()
 
     def restore_thread_deleted(self, provider: str, provider_thread_id: str) -> None:
         """Restore a deleted thread."""
@@ -336,6 +567,8 @@ class EmailRepo:
                 SET deleted_at = NULL
                 WHERE provider = %s AND provider_thread_id = %s
             """, (provider, provider_thread_id))
+        # Cached detail rows still carry the deleted state; drop everything
+        _invalidate_all()
 
     def get_email_row(self, email_id: int) -> Optional[dict]:
         """Get email row data for digest display."""
@@ -2,7 +2,6 @@
 Email search service that provides intelligent email retrieval capabilities
 for the LLM to use in conversations with users.
 """
-import os
 import sys
 import pathlib
 from typing import List, Dict, Optional, Any
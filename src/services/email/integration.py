@@ -5,11 +5,11 @@ This module makes it easy to add new email providers in the future.
 """
 
 import importlib
-import os
-import sys
-from typing import Dict, List, Optional, Any, Union
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any
 
-from .filtering import filter_emails
+from .filtering import filter_emails, _parse as _parse_date
 
 # Define provider interface
 class EmailProviderInterface:
@@ -31,9 +31,22 @@ class EmailProviderInterface:
             "provider": self.get_name()
         }
 
+# Known providers: name -> (module under .providers, class). Listing names
+# needs no imports; a provider's module (and its Google/MSAL client
+# libraries) is only imported the first time that provider is used.
+# To add a provider, drop its module in providers/ and add it here.
+PROVIDER_MODULES: Dict[str, tuple] = {
+    "dummy": ("dummy_provider", "DummyProvider"),
+    "gmail": ("gmail_provider", "GmailProvider"),
+    "outlook": ("outlook_provider", "OutlookGraphProvider"),
+}
+
 # Provider registry
 class EmailProviderRegistry:
     _providers: Dict[str, EmailProviderInterface] = {}
+    # Names whose import/instantiation already failed (warned once, not retried)
+    _failed: set = set()
+    _lock = threading.Lock()
     
     @classmethod
     def register(cls, provider: EmailProviderInterface) -> None:
@@ -44,22 +57,52 @@ class EmailProviderRegistry:
     
     @classmethod
     def get_provider(cls, name: str) -> Optional[EmailProviderInterface]:
-        """Get a provider by name"""
-        return cls._providers.get(name.lower())
+        """Get a provider by name, loading it on first use"""
+        name = name.lower()
+        provider = cls._providers.get(name)
+        if provider is None and name in PROVIDER_MODULES and name not in cls._failed:
+            provider = cls._load(name)
+        return provider
     
     @classmethod
     def get_all_providers(cls) -> List[str]:
-        """Get list of all registered provider names"""
-        return list(cls._providers.keys())
+        """Get list of all provider names (without importing any provider module)"""
+        return list(dict.fromkeys([*PROVIDER_MODULES, *cls._providers]))
+    
+    @classmethod
+    def _load(cls, name: str) -> Optional[EmailProviderInterface]:
+        """Import, instantiate and register one provider from PROVIDER_MODULES"""
+        with cls._lock:
+            # Another thread may have loaded it while we waited
+            if name in cls._providers or name in cls._failed:
+                return cls._providers.get(name)
+            module_name, class_name = PROVIDER_MODULES[name]
+            try:
+                module = importlib.import_module(f'.providers.{module_name}', package=__package__)
+            except Exception as e:
+                print(f"Warning: Could not import provider module {module_name}: {e}")
+                cls._failed.add(name)
+                return None
+            try:
+                cls.register(getattr(module, class_name)())
+            except Exception as e:
+                print(f"Warning: Could not register provider {class_name}: {e}")
+                cls._failed.add(name)
+            return cls._providers.get(name)
 
 # Main email reading function
-def get_latest_emails(provider: str, count: int = 10, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+def get_latest_emails(provider: str, count: int = 10, filters: Optional[Dict[str, Any]] = None,
+                      *, since: Optional[datetime] = None) -> Dict[str, Any]:
     """
     Get latest emails from the specified provider
     
     Args:
         provider (str): The name of the email provider to use
         count (int): Number of emails to retrieve (default: 10)
+        since (datetime): Only fetch emails received after this. The provider
+            filters server-side, so `count` isn't spent on emails already seen.
+            Defaults to filters["date_from"] when that is given. A naive
+            datetime is taken to be UTC.
         
     Returns:
         dict: Result information including success status, message, and emails list
@@ -80,7 +123,17 @@ def get_latest_emails(provider: str, count: int = 10, filters: Optional[Dict[str
     try:
         # Check if provider supports email reading
         if hasattr(email_provider, 'get_latest_emails'):
-            result = email_provider.get_latest_emails(count)
+            if since is None and filters:
+                since = _parse_date(filters.get("date_from"))
+            if since is not None:
+                # Providers read naive datetimes differently (Gmail as local
+                # time, Graph as UTC); pin the zone once here
+                if since.tzinfo is None:
+                    since = since.replace(tzinfo=timezone.utc)
+                result = email_provider.get_latest_emails(count, since=since)
+            else:
+                result = email_provider.get_latest_emails(count)
+            # Client-side filters stay as a safety net for the server-side bound
             if result.get("success") and filters:
                 emails = result.get("emails", [])
                 result["emails"] = filter_emails(emails, **filters)
@@ -144,44 +197,3 @@ def send_email(
             "success": False,
             "message": f"Error sending email via {provider}: {str(e)}"
         }
-
-# Auto-discover and register providers
-def _discover_providers():
-    """Automatically discover and register email providers"""
-    providers_dir = os.path.join(os.path.dirname(__file__), "providers")
-    
-    if not os.path.exists(providers_dir):
-        print(f"Warning: Providers directory not found: {providers_dir}")
-        return
-    
-    # Get all Python files in the providers directory
-    for filename in os.listdir(providers_dir):
-        if filename.endswith('.py') and not filename.startswith('__'):
-            module_name = filename[:-3]  # Remove .py extension
-            
-            try:
-                # Import the module
-                module = importlib.import_module(f'.providers.{module_name}', package=__package__)
-                
-                # Look for provider classes in the module
-                for attr_name in dir(module):
-                    attr = getattr(module, attr_name)
-                    
-                    # Check if it's a class that might be a provider
-                    if (isinstance(attr, type) and 
-                        hasattr(attr, 'get_name') and
-                        hasattr(attr, 'send_email') and
-                        attr_name.endswith('Provider')):
-                        
-                        try:
-                            # Try to instantiate and register the provider
-                            provider_instance = attr()
-                            EmailProviderRegistry.register(provider_instance)
-                        except Exception as e:
-                            print(f"Warning: Could not register provider {attr_name}: {e}")
-                            
-            except Exception as e:
-                print(f"Warning: Could not import provider module {module_name}: {e}")
-
-# Initialize providers when module is imported
-_discover_providers()
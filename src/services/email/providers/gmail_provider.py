@@ -5,11 +5,10 @@ import os
 import base64
 import json
 import pathlib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
 from email.message import EmailMessage
-from email import encoders
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -22,9 +21,17 @@ PROJECT_ROOT = pathlib.Path(__file__).resolve().parents[4]  # Go up 4 levels: pr
 CREDENTIALS_FILE = PROJECT_ROOT / "config" / "client_secret_147697913284-lrl04fga24gpkk6ltv6ai3d4eps602lb.apps.googleusercontent.com.json"
 TOKEN_FILE = PROJECT_ROOT / "config" / "gmail_token.json"
 
+# Auth state rarely changes between /status calls; re-probe at most every 30s.
+# Keyed by token file -> (monotonic timestamp, authenticated)
+AUTH_CACHE_TTL = 30.0
+_AUTH_CACHE: Dict[str, Tuple[float, bool]] = {}
+
 class GmailProvider:
     """Gmail email provider using Google API with OAuth2"""
     
+    # Credentials from the last successful is_authenticated() probe
+    _creds = None
+    
     def get_name(self):
         return "gmail"
     
@@ -78,15 +85,27 @@ class GmailProvider:
         return creds
     
     def is_authenticated(self):
-        """Check if we have valid cached credentials"""
+        """Check if we have valid cached credentials (memoized for AUTH_CACHE_TTL seconds)"""
+        cached = _AUTH_CACHE.get(str(TOKEN_FILE))
+        if cached and time.monotonic() - cached[0] < AUTH_CACHE_TTL:
+            return cached[1]
+
         try:
-            creds = self.get_credentials(interactive=False)
-            return creds is not None and creds.valid
+            # Until the access token expires, validity is a local check; only
+            # reload (and refresh) the token file once it has
+            creds = self._creds
+            if creds is None or not creds.valid:
+                creds = self._creds = self.get_credentials(interactive=False)
+            authenticated = creds is not None and creds.valid
         except:
-            return False
+            authenticated = False
+        _AUTH_CACHE[str(TOKEN_FILE)] = (time.monotonic(), authenticated)
+        return authenticated
     
     def setup_authentication(self):
         """Setup authentication interactively (run this once)"""
+        _AUTH_CACHE.pop(str(TOKEN_FILE), None)
+        self._creds = None
         try:
             creds = self.get_credentials(interactive=True)
             if creds and creds.valid:
@@ -169,12 +188,13 @@ class GmailProvider:
                 "error": str(e)
             }
     
-    def get_latest_emails(self, count=10, interactive=False):
+    def get_latest_emails(self, count=10, interactive=False, since: Optional[datetime] = None):
         """Get latest emails from Gmail inbox
         
         Args:
             count (int): Number of emails to retrieve (default: 10)
             interactive (bool): Whether to allow interactive authentication
+            since (datetime): Only return emails received after this (Gmail "after:" query)
             
         Returns:
             dict: Result with success status, message, and emails list
@@ -192,12 +212,12 @@ class GmailProvider:
                 
             service = build("gmail", "v1", credentials=creds)
             
-            # Get list of messages
-            results = service.users().messages().list(
-                userId="me", 
-                labelIds=["INBOX"],
-                maxResults=count
-            ).execute()
+            # Get list of messages; with `since`, Gmail drops older ones server-side
+            # (after: takes epoch seconds, so naive datetimes are read as local time)
+            list_kwargs = {"userId": "me", "labelIds": ["INBOX"], "maxResults": count}
+            if since is not None:
+                list_kwargs["q"] = f"after:{int(since.timestamp())}"
+            results = service.users().messages().list(**list_kwargs).execute()
             
             messages = results.get("messages", [])
             emails = []
@@ -0,0 +1,42 @@
+"""
+Pooled requests session for Microsoft Graph.
+
+Kept out of outlook_provider so that importing the provider doesn't import requests.
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class GraphSession(requests.Session):
+    """Pooled keep-alive session for Microsoft Graph.
+
+    Relative URLs (``/me/messages``) are resolved against ``base_url`` and
+    a bearer token is injected when the caller didn't pass one, so the same
+    session can be handed to the compose/reply helpers via ``bot_data``.
+    """
+
+    def __init__(self, base_url: str, token_provider=None):
+        super().__init__()
+        self._base_url = base_url
+        self._token_provider = token_provider
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=10,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504],
+            ),
+        )
+        self.mount("https://", adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        if url.startswith("/"):
+            url = self._base_url + url
+        headers = dict(kwargs.pop("headers", None) or {})
+        if "Authorization" not in headers and self._token_provider is not None:
+            token = self._token_provider()
+            if token:
+                headers["Authorization"] = f"Bearer {token}"
+        return super().request(method, url, *args, headers=headers, **kwargs)
@@ -6,6 +6,11 @@ from typing import List, Optional
 
 from .model import NormalizedEmail
 
+GRAPH_READ_HEADERS = {
+    "Accept-Encoding": "gzip, deflate",
+    "Prefer": 'outlook.body-content-type="text"',
+}
+
 
 def _addr(obj) -> tuple[Optional[str], Optional[str]]:
     """Extract name and address from a Graph API recipient object."""
@@ -44,7 +49,8 @@ def outlook_fetch_latest(graph, limit: int = 20) -> List[NormalizedEmail]:
         "&$select=id,conversationId,from,subject,bodyPreview,receivedDateTime,body,"
         "toRecipients,ccRecipients,bccRecipients"
     )
-    resp = graph.get(url)
+    # Ask Graph for plain-text bodies and a gzip-compressed payload
+    resp = graph.get(url, headers=GRAPH_READ_HEADERS)
     resp.raise_for_status()
     items = resp.json().get("value", [])
     out: List[NormalizedEmail] = []
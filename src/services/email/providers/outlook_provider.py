@@ -4,11 +4,22 @@ Outlook email provider plugin for the email integration system.
 Uses Microsoft Graph API with OAuth2 Device Code flow for BYU email integration.
 """
 import os
-import json
+import asyncio
+import logging
 import pathlib
-import msal
-import requests
-from typing import Dict, Any, Optional, List
+import threading
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, Any, Optional, Tuple
+
+# JSON codec (orjson when installed) and recipient objects shared with the providers.* Graph helpers
+from providers._json import loads as _loads, dumps as _dumps
+from providers._graph_recipients import graph_recipients
+
+# msal and requests are imported on first use: msal alone pulls in
+# cryptography/PyJWT and noticeably slows bot cold start
+if TYPE_CHECKING:
+    from .graph_session import GraphSession
 
 # Try to load environment variables with fallback
 try:
@@ -19,8 +30,100 @@ except ImportError:
     print("Warning: python-dotenv not available. Using system environment variables only.")
     # dotenv is not available, will use os.getenv directly
 
+# Token/cache chatter is DEBUG so the polling hot path costs nothing at INFO;
+# the interactive device-code prompts below stay on stdout
+logger = logging.getLogger(__name__)
+
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+MESSAGE_FIELDS = ("id", "subject", "from", "receivedDateTime", "bodyPreview", "isRead", "hasAttachments", "internetMessageId")
+MESSAGE_SELECT_FIELDS = ",".join(MESSAGE_FIELDS)
+# Enough for header-only listings (digest lines); bodies are fetched on demand
+DIGEST_FIELDS = ("id", "subject", "from", "receivedDateTime")
+_BASE_HEADERS = {
+    "Content-Type": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+}
+_LIST_URL_TMPL = GRAPH_BASE_URL + "/me/messages?$top={count}&$select={select}{filter}&$orderby=receivedDateTime desc"
+_SEND_MAIL_URL = GRAPH_BASE_URL + "/me/sendMail"
+# Graph rejects $orderby properties that don't also lead the $filter clause,
+# so the unread filter carries a no-op receivedDateTime bound
+UNREAD_FILTER = "receivedDateTime ge 1900-01-01T00:00:00Z and isRead eq false"
+
+# Auth state rarely changes between /status calls; re-probe at most every 30s.
+# Keyed by token cache file -> (monotonic timestamp, authenticated)
+AUTH_CACHE_TTL = 30.0
+_AUTH_CACHE: Dict[str, Tuple[float, bool]] = {}
+
+
+def _to_email_info(msg: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a Graph message resource into the email dict returned by this provider"""
+    sender = msg.get('from', {}).get('emailAddress', {})
+    return {
+        'id': msg.get('id'),
+        'internet_message_id': msg.get('internetMessageId'),
+        'subject': msg.get('subject', 'No subject'),
+        'from': sender.get('address', 'Unknown'),
+        'from_name': sender.get('name', 'Unknown'),
+        'received_date': msg.get('receivedDateTime', ''),
+        # Standard alias used by the email_check job
+        'date': msg.get('receivedDateTime', ''),
+        'body_preview': msg.get('bodyPreview', ''),
+        'is_read': msg.get('isRead', False),
+        'has_attachments': msg.get('hasAttachments', False)
+    }
+
+
+
+def _auth_headers(access_token: str, **extra: str) -> Dict[str, str]:
+    """Graph request headers for the given bearer token"""
+    return {**_BASE_HEADERS, "Authorization": f"Bearer {access_token}", **extra}
+
+
+def _build_send_mail(to_addr: str, subject: str, body: str, html_body: Optional[str],
+                     cc=None, bcc=None) -> Dict[str, Any]:
+    """Assemble the /me/sendMail payload in one literal"""
+    message = {
+        "subject": subject,
+        "body": {
+            "contentType": "HTML" if html_body else "Text",
+            "content": html_body if html_body else body
+        },
+        "toRecipients": graph_recipients([to_addr]),
+    }
+    if cc:
+        message["ccRecipients"] = graph_recipients(cc)
+    if bcc:
+        message["bccRecipients"] = graph_recipients(bcc)
+    return {"message": message}
+
+
 class OutlookGraphProvider:
     """Outlook email provider using Microsoft Graph API for BYU integration"""
+
+    # MSAL app and token cache are built once per process and shared by every
+    # instance; the bot creates a fresh provider for each /status call
+    _app = None
+    _cache = None
+    _save_cache_fn = None
+    _msal_lock = threading.Lock()
+    # mtime of the token cache file when it was last loaded or saved
+    _cache_mtime = None
+    # Resolved (and created) once per process by _get_config_dir
+    _config_dir = None
+
+    @classmethod
+    def _get_config_dir(cls) -> pathlib.Path:
+        """Resolve the project config directory once per process"""
+        if cls._config_dir is None:
+            # Store token cache in config directory (same as Gmail)
+            # Always use absolute path to the project config directory
+            project_root = pathlib.Path(__file__).resolve().parents[4]  # Go up 4 levels: providers -> email -> services -> src -> project_root
+            config_dir = pathlib.Path(
+                os.getenv("CONFIG_DIR", project_root / "config")
+            ).resolve()
+            config_dir.mkdir(parents=True, exist_ok=True)
+            cls._config_dir = config_dir
+        return cls._config_dir
     
     def __init__(self):
         # Load configuration from environment variables
@@ -36,85 +139,98 @@ class OutlookGraphProvider:
             "https://graph.microsoft.com/Mail.Send",
         ]
 
-        # Store token cache in config directory (same as Gmail)
-        # Always use absolute path to the project config directory
-        # Use pathlib.Path for cleaner path navigation
-        current_file = pathlib.Path(__file__).resolve()
-        project_root = current_file.parents[4]  # Go up 4 levels: providers -> email -> services -> src -> project_root
-        config_dir = pathlib.Path(
-            os.getenv("CONFIG_DIR", project_root / "config")
-        ).resolve()
-        config_dir.mkdir(parents=True, exist_ok=True)
+        config_dir = self._get_config_dir()
         self.token_cache_file = str(config_dir / "byu_outlook_token_cache.json")
-        print(f"📂 Using Outlook token cache file: {self.token_cache_file}")
+        logger.debug("📂 Using Outlook token cache file: %s", self.token_cache_file)
+
+        # One pooled session per provider so TLS handshakes are amortized (created on first use)
+        self._session = None
 
-        # Initialize MSAL-related placeholders
-        self._app = None
-        self._cache = None
-        self._save_cache_fn = None
+    @property
+    def session(self) -> "GraphSession":
+        """Shared Graph session (also used by the Telegram bot for compose/reply)"""
+        if self._session is None:
+            from .graph_session import GraphSession
+            self._session = GraphSession(
+                GRAPH_BASE_URL, lambda: self._get_access_token(interactive=False)
+            )
+        return self._session
     
     def get_name(self):
         return "outlook"
     
     def _get_msal_app(self):
-        """Initialize MSAL application with persistent token cache"""
-        # Create cache if not already done
-        if self._cache is None:
-            self._cache = msal.SerializableTokenCache()
+        """Return the process-wide MSAL application with persistent token cache"""
+        import msal
+
+        cls = OutlookGraphProvider
+        with cls._msal_lock:
+            # Create cache if not already done
+            if cls._cache is None:
+                cls._cache = msal.SerializableTokenCache()
 
-        # Load existing cache from disk (this is safe to call repeatedly)
-        if os.path.exists(self.token_cache_file):
+            # Load existing cache from disk, but only when it changed since the
+            # last load/save (one stat() instead of exists + open + parse)
             try:
-                with open(self.token_cache_file, 'r') as f:
-                    data = f.read()
-                    if data:
-                        self._cache.deserialize(data)
-                        # Print debug info on token cache
-                        print(f"🔍 Loaded token cache from {self.token_cache_file} (size: {len(data)} bytes)")
-            except Exception as e:
-                print(f"⚠️ Warning: Could not load token cache: {e}")
-        else:
-            print(f"⚠️ No token cache file found at {self.token_cache_file}")
+                st = os.stat(self.token_cache_file)
+            except FileNotFoundError:
+                st = None
+                logger.debug("⚠️ No token cache file found at %s", self.token_cache_file)
 
-        if self._app is None:
-            self._app = msal.PublicClientApplication(
-                self.client_id,
-                authority=f"https://login.microsoftonline.com/{self.tenant}",
-                token_cache=self._cache
-            )
-            
-            # Save cache when it changes
-            def save_cache():
-                if not self._cache:
-                    return
-                # MSAL SerializableTokenCache.has_state_changed can be a property or a method depending on version
+            if st is not None and st.st_mtime != cls._cache_mtime:
                 try:
-                    changed_attr = getattr(self._cache, 'has_state_changed', None)
-                    changed = False
-                    if callable(changed_attr):
-                        changed = bool(changed_attr())
-                    elif isinstance(changed_attr, bool):
-                        changed = changed_attr
-                    else:
-                        # Fallback: assume changed and write once
-                        changed = True
-                except Exception:
-                    changed = True
+                    with open(self.token_cache_file, 'r') as f:
+                        data = f.read()
+                        if data:
+                            cls._cache.deserialize(data)
+                            # Print debug info on token cache
+                            logger.debug("🔍 Loaded token cache from %s (size: %d bytes)", self.token_cache_file, len(data))
+                    cls._cache_mtime = st.st_mtime
+                except Exception as e:
+                    logger.warning("⚠️ Could not load token cache: %s", e)
+
+            if cls._app is None:
+                cls._app = msal.PublicClientApplication(
+                    self.client_id,
+                    authority=f"https://login.microsoftonline.com/{self.tenant}",
+                    token_cache=cls._cache
+                )
+                token_cache_file = self.token_cache_file
 
-                if changed:
+                # Save cache when it changes
+                def save_cache():
+                    if not cls._cache:
+                        return
+                    # MSAL SerializableTokenCache.has_state_changed can be a property or a method depending on version
                     try:
-                        with open(self.token_cache_file, 'w') as f:
-                            data = self._cache.serialize()
-                            f.write(data)
-                            print(f"💾 Saved token cache to {self.token_cache_file} (size: {len(data)} bytes)")
-                    except Exception as e:
-                        print(f"Warning: Could not save token cache: {e}")
-            
-            # Note: add_remove_callback not available in all MSAL versions
-            # We'll manually save the cache after token operations
-            self._save_cache_fn = save_cache
-            
-        return self._app
+                        changed_attr = getattr(cls._cache, 'has_state_changed', None)
+                        changed = False
+                        if callable(changed_attr):
+                            changed = bool(changed_attr())
+                        elif isinstance(changed_attr, bool):
+                            changed = changed_attr
+                        else:
+                            # Fallback: assume changed and write once
+                            changed = True
+                    except Exception:
+                        changed = True
+
+                    if changed:
+                        try:
+                            with open(token_cache_file, 'w') as f:
+                                data = cls._cache.serialize()
+                                f.write(data)
+                                logger.debug("💾 Saved token cache to %s (size: %d bytes)", token_cache_file, len(data))
+                            # Our own write shouldn't trigger a reload
+                            cls._cache_mtime = os.stat(token_cache_file).st_mtime
+                        except Exception as e:
+                            logger.warning("Could not save token cache: %s", e)
+
+                # Note: add_remove_callback not available in all MSAL versions
+                # We'll manually save the cache after token operations
+                cls._save_cache_fn = staticmethod(save_cache)
+
+            return cls._app
     
     def _get_access_token(self, interactive=True):
         """Get access token using device code flow or cached token
@@ -130,20 +246,20 @@ class OutlookGraphProvider:
         # Try to get token silently first (from cache)
         accounts = app.get_accounts()
         if accounts:
-            print("🔄 Attempting to use cached token...")
+            logger.debug("🔄 Attempting to use cached token...")
             result = app.acquire_token_silent(self.scopes, account=accounts[0])
             if result and "access_token" in result:
-                print("✅ Using cached token successfully!")
+                logger.debug("✅ Using cached token successfully!")
                 # Save cache in case token was refreshed
                 if hasattr(self, '_save_cache_fn'):
                     self._save_cache_fn()
                 return result["access_token"]
             else:
-                print("⚠️ Cached token expired or invalid")
+                logger.info("⚠️ Cached token expired or invalid")
         
         # If not interactive mode (for Telegram bot), return None
         if not interactive:
-            print("❌ No valid cached token available and interactive mode disabled")
+            logger.info("❌ No valid cached token available and interactive mode disabled")
             return None
         
         # If silent acquisition fails, use device code flow
@@ -191,6 +307,7 @@ class OutlookGraphProvider:
     
     def setup_authentication(self) -> Dict[str, Any]:
         """Setup authentication interactively (run this once)"""
+        _AUTH_CACHE.pop(self.token_cache_file, None)
         try:
             access_token = self._get_access_token(interactive=True)
             if access_token:
@@ -213,21 +330,45 @@ class OutlookGraphProvider:
             }
     
     def is_authenticated(self):
-        """Check if we have valid cached credentials"""
+        """Check if we have valid cached credentials (memoized for AUTH_CACHE_TTL seconds)"""
+        cached = _AUTH_CACHE.get(self.token_cache_file)
+        if cached and time.monotonic() - cached[0] < AUTH_CACHE_TTL:
+            return cached[1]
+
+        authenticated = self._check_authenticated()
+        _AUTH_CACHE[self.token_cache_file] = (time.monotonic(), authenticated)
+        return authenticated
+
+    def _check_authenticated(self) -> bool:
         try:
             # First explicitly check if token cache file exists
             if not os.path.exists(self.token_cache_file):
-                print(f"❌ Token cache file not found at {self.token_cache_file}")
+                logger.info("❌ Token cache file not found at %s", self.token_cache_file)
                 return False
                 
             token = self._get_access_token(interactive=False)
             return token is not None
         except Exception as e:
-            print(f"❌ Authentication check failed: {e}")
+            logger.warning("❌ Authentication check failed: %s", e)
             return False
+
+    async def is_authenticated_async(self) -> bool:
+        """Async variant of is_authenticated that keeps the event loop free"""
+        return await asyncio.to_thread(self.is_authenticated)
     
-    def get_latest_emails(self, count: int = 10, interactive: bool = False) -> Dict[str, Any]:
-        """Get the latest emails from the inbox"""
+    def get_latest_emails(self, count: int = 10, interactive: bool = False,
+                          fields: Tuple[str, ...] = MESSAGE_FIELDS,
+                          unread_only: bool = False,
+                          since: Optional[datetime] = None) -> Dict[str, Any]:
+        """Get the latest emails from the inbox
+
+        Args:
+            count (int): Number of messages to return
+            interactive (bool): Whether to allow interactive authentication
+            fields (tuple): Graph properties to $select (e.g. DIGEST_FIELDS)
+            unread_only (bool): Only return unread messages
+            since (datetime): Only return messages received after this (filtered by Graph)
+        """
         try:
             access_token = self._get_access_token(interactive=interactive)
             if not access_token:
@@ -237,67 +378,68 @@ class OutlookGraphProvider:
                     "provider": "outlook",
                     "requires_auth": True
                 }
-            headers = {
-                'Authorization': f'Bearer {access_token}',
-                'Content-Type': 'application/json'
-            }
-            
-            # Get user's messages with more details (include ids for dedup)
-            url = (
-                "https://graph.microsoft.com/v1.0/me/messages"
-                f"?$top={count}"
-                "&$select=id,subject,from,receivedDateTime,bodyPreview,isRead,hasAttachments,internetMessageId"
-                "&$orderby=receivedDateTime desc"
-            )
-            response = requests.get(url, headers=headers, timeout=30)
+            headers = _auth_headers(access_token)
             
-            if response.status_code == 200:
-                messages_data = response.json()
-                emails = []
-
-                for msg in messages_data.get('value', []):
-                    email_info = {
-                        'id': msg.get('id'),
-                        'internet_message_id': msg.get('internetMessageId'),
-                        'subject': msg.get('subject', 'No subject'),
-                        'from': msg.get('from', {}).get('emailAddress', {}).get('address', 'Unknown'),
-                        'from_name': msg.get('from', {}).get('emailAddress', {}).get('name', 'Unknown'),
-                        'received_date': msg.get('receivedDateTime', ''),
-                        # Standard alias used by the email_check job
-                        'date': msg.get('receivedDateTime', ''),
-                        'body_preview': msg.get('bodyPreview', ''),
-                        'is_read': msg.get('isRead', False),
-                        'has_attachments': msg.get('hasAttachments', False)
-                    }
-                    emails.append(email_info)
+            response = self.session.get(self._latest_emails_url(count, fields, unread_only, since), headers=headers, timeout=30)
+            return self._latest_emails_result(response.status_code, response.content, response.text)
 
-                return {
-                    "success": True,
-                    "message": f"Retrieved {len(emails)} emails successfully",
-                    "emails": emails,
-                    "provider": "outlook"
-                }
-            else:
-                if response.status_code == 401:
-                    return {
-                        "success": False,
-                        "message": "Unauthorized (401). Token may be expired. Please re-authenticate.",
-                        "provider": "outlook",
-                        "requires_auth": True
-                    }
-                return {
-                    "success": False,
-                    "message": f"Failed to get emails: {response.status_code} - {response.text}",
-                    "provider": "outlook"
-                }
-                
         except Exception as e:
             return {
                 "success": False,
                 "message": f"Error getting emails: {str(e)}",
                 "provider": "outlook"
             }
-    
+
+    @staticmethod
+    def _latest_emails_url(count: int, fields: Tuple[str, ...] = MESSAGE_FIELDS,
+                           unread_only: bool = False, since: Optional[datetime] = None) -> str:
+        # Get user's messages, selecting only what the caller renders (ids always included for dedup)
+        if since is not None:
+            # Server-side date bound (naive datetimes are taken as UTC); it also
+            # satisfies Graph's $orderby/$filter rule that UNREAD_FILTER works around
+            if since.tzinfo is not None:
+                since = since.astimezone(timezone.utc)
+            clause = f"receivedDateTime gt {since:%Y-%m-%dT%H:%M:%SZ}"
+            if unread_only:
+                clause += " and isRead eq false"
+            filter_ = f"&$filter={clause}"
+        else:
+            filter_ = f"&$filter={UNREAD_FILTER}" if unread_only else ""
+        return _LIST_URL_TMPL.format(
+            count=count,
+            select=MESSAGE_SELECT_FIELDS if fields is MESSAGE_FIELDS else ','.join(fields),
+            filter=filter_,
+        )
+
+    @staticmethod
+    def _latest_emails_result(status_code: int, content: bytes, text: str) -> Dict[str, Any]:
+        """Turn a /me/messages response into this provider's result dict"""
+        if status_code == 200:
+            messages_data = _loads(content)
+            emails = []
+
+            for msg in messages_data.get('value', []):
+                emails.append(_to_email_info(msg))
+
+            return {
+                "success": True,
+                "message": f"Retrieved {len(emails)} emails successfully",
+                "emails": emails,
+                "provider": "outlook"
+            }
+        if status_code == 401:
+            return {
+                "success": False,
+                "message": "Unauthorized (401). Token may be expired. Please re-authenticate.",
+                "provider": "outlook",
+                "requires_auth": True
+            }
+        return {
+            "success": False,
+            "message": f"Failed to get emails: {status_code} - {text}",
+            "provider": "outlook"
+        }
+
     def send_email(self, to_addr: str, subject: str, body: str, html_body: Optional[str] = None, interactive: bool = False, **kwargs) -> Dict[str, Any]:
         """Send email using Microsoft Graph API"""
         try:
@@ -310,45 +452,17 @@ class OutlookGraphProvider:
                     "requires_auth": True
                 }
             
-            # Prepare email content
-            email_content = {
-                "message": {
-                    "subject": subject,
-                    "body": {
-                        "contentType": "HTML" if html_body else "Text",
-                        "content": html_body if html_body else body
-                    },
-                    "toRecipients": [
-                        {
-                            "emailAddress": {
-                                "address": to_addr
-                            }
-                        }
-                    ]
-                }
-            }
-            
-            # Add CC and BCC if provided
-            if 'cc' in kwargs and kwargs['cc']:
-                email_content["message"]["ccRecipients"] = [
-                    {"emailAddress": {"address": cc}} for cc in kwargs['cc']
-                ]
-            
-            if 'bcc' in kwargs and kwargs['bcc']:
-                email_content["message"]["bccRecipients"] = [
-                    {"emailAddress": {"address": bcc}} for bcc in kwargs['bcc']
-                ]
-            
+            email_content = _build_send_mail(
+                to_addr, subject, body, html_body, kwargs.get('cc'), kwargs.get('bcc')
+            )
+
             # Send email via Microsoft Graph API
-            headers = {
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.post(
-                "https://graph.microsoft.com/v1.0/me/sendMail",
+            headers = _auth_headers(access_token)
+
+            response = self.session.post(
+                _SEND_MAIL_URL,
                 headers=headers,
-                json=email_content
+                data=_dumps(email_content)
             )
             
             if response.status_code == 202:  # Accepted
@@ -3,7 +3,7 @@ Enhanced reply routing for hybrid Gmail/BYU architecture.
 Detects BYU emails and routes replies through proper provider.
 """
 import os
-from typing import Dict, Optional
+from typing import Dict
 
 def detect_reply_provider(email_detail: Dict) -> str:
     """
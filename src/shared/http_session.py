@@ -0,0 +1,31 @@
+"""
+Pooled keep-alive requests sessions for outbound HTTP (Telegram Bot API, llama.cpp).
+
+A bare requests.post opens a new TCP (and TLS) connection every call; a
+module-level session from make_session() reuses it across calls.
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def make_session(pool_connections: int = 4, pool_maxsize: int = 16) -> requests.Session:
+    """Return a session with a pooled, retrying adapter on http:// and https://.
+
+    Retry keeps urllib3's default allowed_methods, so a POST is only retried
+    when the connection failed before it was sent, never re-sent after a
+    5xx/429 (a repeated sendMessage would post the message twice).
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
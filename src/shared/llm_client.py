@@ -3,17 +3,46 @@ LLM Client for email summarization and conversational AI using llama.cpp server
 Now with intelligent tool-based system where LLM decides what actions to take
 """
 import os
-import requests
 import json
 from typing import Optional, List, Dict
 import datetime
 import re
+import time
 from pathlib import Path
 
+from .http_session import make_session
+
+# LLMClient is created per chat message; the connection to llama.cpp is not
+_SESSION = make_session()
+
+# orjson is optional; the memory file is re-read and rewritten on every summary update
+try:
+    import orjson
+
+    def _json_bytes(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_bytes(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+    _json_loads = json.loads
+
+
+def _write_json_atomic(path: Path, obj) -> None:
+    """Write obj as JSON via a temp file + rename, so a crash mid-write can't
+    leave a truncated file behind (which would silently drop all memory)"""
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(_json_bytes(obj))
+    os.replace(tmp, path)
+
 class LLMClient:
     def __init__(self):
         self.base_url = os.getenv('LLM_BASE_URL', 'http://192.168.0.83:8085')
         self.timeout = int(os.getenv('LLM_TIMEOUT', '30'))
+        # A dead llama.cpp server should fail in seconds, not after the full generation timeout
+        self.connect_timeout = float(os.getenv('LLM_CONNECT_TIMEOUT', '5'))
         
         # Persistent conversation memory setup
         self.memory_dir = Path(os.getenv('LLM_MEMORY_DIR', '/home/mentorius/AI_Services/PA_V2/data/llm_memory'))
@@ -27,23 +56,42 @@ class LLMClient:
         self.max_context_tokens = int(os.getenv('LLM_MAX_CONTEXT', '32768'))
         self.reserve_tokens = int(os.getenv('LLM_RESERVE_TOKENS', '1536'))
         
+    def _complete(self, payload: Dict) -> Optional[str]:
+        """POST to llama.cpp /completion with streaming and return the generated text.
+
+        Tokens are read as they arrive (SSE ``data:`` lines), so the connection is
+        released as soon as the server stops, and generation is abandoned once
+        self.timeout seconds have passed overall rather than per read. Returns
+        None on a non-200 response.
+        """
+        deadline = time.monotonic() + self.timeout
+        parts = []
+        with _SESSION.post(
+            f"{self.base_url}/completion",
+            json={**payload, "stream": True},
+            stream=True,
+            timeout=(self.connect_timeout, self.timeout),
+        ) as response:
+            if response.status_code != 200:
+                return None
+            for line in response.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                chunk = json.loads(line[5:])
+                parts.append(chunk.get("content", ""))
+                if chunk.get("stop") or time.monotonic() > deadline:
+                    break
+        return "".join(parts).strip()
+
     def summarize_email(self, subject: str, body: str, max_lines: int = 2) -> str:
         """Summarize email content to specified number of lines using llama.cpp"""
         try:
             clean_body = self._clean_email_body(body)
             prompt = f"Summarize this email in {max_lines} lines: Subject: {subject} Content: {clean_body[:500]}"
             
-            response = requests.post(
-                f"{self.base_url}/completion",
-                json={"prompt": prompt, "max_tokens": 100, "temperature": 0.3},
-                timeout=self.timeout
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                summary = result.get('content', '').strip()
-                if summary:
-                    return summary
+            summary = self._complete({"prompt": prompt, "max_tokens": 100, "temperature": 0.3})
+            if summary:
+                return summary
             
         except Exception as e:
             print(f"⚠️ LLM error: {e}")
@@ -103,9 +151,8 @@ class LLMClient:
         """Load long-term memory for a user"""
         if self.long_term_memory_file.exists():
             try:
-                with self.long_term_memory_file.open("r", encoding="utf-8") as f:
-                    all_memory = json.load(f)
-                    return all_memory.get(user_id, {"summary": "", "facts": [], "email_context": {}})
+                all_memory = _json_loads(self.long_term_memory_file.read_bytes())
+                return all_memory.get(user_id, {"summary": "", "facts": [], "email_context": {}})
             except (json.JSONDecodeError, FileNotFoundError):
                 pass
         return {"summary": "", "facts": [], "email_context": {}}
@@ -115,8 +162,7 @@ class LLMClient:
         all_memory = {}
         if self.long_term_memory_file.exists():
             try:
-                with self.long_term_memory_file.open("r", encoding="utf-8") as f:
-                    all_memory = json.load(f)
+                all_memory = _json_loads(self.long_term_memory_file.read_bytes())
             except (json.JSONDecodeError, FileNotFoundError):
                 pass
         
@@ -127,8 +173,7 @@ class LLMClient:
             "last_updated": datetime.datetime.now().isoformat()
         }
         
-        with self.long_term_memory_file.open("w", encoding="utf-8") as f:
-            json.dump(all_memory, f, ensure_ascii=False, indent=2)
+        _write_json_atomic(self.long_term_memory_file, all_memory)
     
     def _estimate_tokens(self, text: str) -> int:
         """Rough token estimation (4 chars ≈ 1 token for most models)"""
@@ -228,22 +273,14 @@ INSTRUCTIONS:
             
             prompt += "Assistant:"
             
-            response = requests.post(
-                f"{self.base_url}/completion",
-                json={
-                    "prompt": prompt,
-                    "max_tokens": 500,
-                    "temperature": 0.7,
-                    "stop": ["User:", "Human:", "System:"],
-                    "stream": False
-                },
-                timeout=self.timeout
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                answer = result.get('content', '').strip()
-                
+            answer = self._complete({
+                "prompt": prompt,
+                "max_tokens": 500,
+                "temperature": 0.7,
+                "stop": ["User:", "Human:", "System:"],
+            })
+            
+            if answer is not None:
                 # Check if the LLM wants to use a tool
                 tool_usage = self._detect_and_execute_tools(answer, user_message)
                 if tool_usage:
@@ -335,9 +372,6 @@ INSTRUCTIONS:
         """Tool: Search emails in local database"""
         try:
             # Import here to avoid circular imports
-            import sys
-            import pathlib
-            sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
             from services.email.email_search_service import EmailSearchService
             
             search_service = EmailSearchService()
@@ -390,9 +424,6 @@ INSTRUCTIONS:
         """Tool: Search for recent emails with special handling for 'last' and 'latest' queries"""
         try:
             # Import here to avoid circular imports
-            import sys
-            import pathlib
-            sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
             from services.email.email_search_service import EmailSearchService
             
             search_service = EmailSearchService()
@@ -451,9 +482,6 @@ INSTRUCTIONS:
         """Tool: Search directly in Gmail/Outlook using their APIs"""
         try:
             # Import here to avoid circular imports
-            import sys
-            import pathlib
-            sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
             from services.email.email_search_service import EmailSearchService
             
             search_service = EmailSearchService()
@@ -481,9 +509,6 @@ INSTRUCTIONS:
         """Tool: Query database for email statistics and analytics"""
         try:
             # Import here to avoid circular imports
-            import sys
-            import pathlib
-            sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
             from services.database.database_query_service import DatabaseQueryService
             
             query_service = DatabaseQueryService()
@@ -511,9 +536,6 @@ INSTRUCTIONS:
         """Get full details of a specific email by ID"""
         try:
             # Import here to avoid circular imports
-            import sys
-            import pathlib
-            sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
             from services.email.email_search_service import EmailSearchService
             
             search_service = EmailSearchService()
@@ -592,22 +614,14 @@ Conversation:
 
 Summary:"""
             
-            response = requests.post(
-                f"{self.base_url}/completion",
-                json={
-                    "prompt": summary_prompt,
-                    "max_tokens": 200,
-                    "temperature": 0.3,
-                    "stop": ["User:", "Human:"],
-                    "stream": False
-                },
-                timeout=self.timeout
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                new_summary = result.get('content', '').strip()
-                
+            new_summary = self._complete({
+                "prompt": summary_prompt,
+                "max_tokens": 200,
+                "temperature": 0.3,
+                "stop": ["User:", "Human:"],
+            })
+            
+            if new_summary is not None:
                 # Update long-term memory
                 long_term = self._load_long_term_memory(user_id)
                 facts = long_term.get('facts', [])
@@ -632,6 +646,8 @@ Summary:"""
             r"i use ([^.]+) for ([^.]+)"
         ]
         
+        # The list keeps recency order; the set answers "already known?" in O(1)
+        known = set(existing_facts)
         for msg in messages:
             if msg['role'] == 'user':
                 content = msg['content'].lower()
@@ -639,18 +655,16 @@ Summary:"""
                     matches = re.finditer(pattern, content)
                     for match in matches:
                         fact = match.group(1).strip()
-                        if len(fact) > 3 and fact not in existing_facts:
+                        if len(fact) > 3 and fact not in known:
                             existing_facts.append(fact)
+                            known.add(fact)
                             if len(existing_facts) > 20:  # Keep only recent facts
-                                existing_facts.pop(0)
+                                known.discard(existing_facts.pop(0))
     
     def _build_email_context(self) -> str:
         """Build context from recent emails for conversation"""
         try:
             # Import here to avoid circular imports
-            import sys
-            import pathlib
-            sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
             from services.email.email_repo import EmailRepo
             
             repo = EmailRepo()
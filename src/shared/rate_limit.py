@@ -0,0 +1,92 @@
+"""
+Client-side pacing for the Telegram Bot API.
+
+Telegram allows roughly 30 messages/second per bot and answers bursts beyond
+that with 429 "Too Many Requests: retry after N". Pacing sends ourselves is
+cheaper than sitting out that penalty.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: up to `rate` acquisitions per `per` seconds."""
+
+    def __init__(self, rate: float = 25, per: float = 1.0):
+        self.capacity = rate
+        self.fill_rate = rate / per
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token now; return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.fill_rate)
+            self._updated = now
+            self._tokens -= 1
+            # A negative balance is the wait this caller owes; later callers queue behind it
+            return -self._tokens / self.fill_rate if self._tokens < 0 else 0.0
+
+    def acquire(self) -> None:
+        """Take one token, sleeping until one is available."""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """acquire() for coroutines: waits without blocking the event loop."""
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Empty the bucket so nobody sends for `seconds` (server asked us to back off)."""
+        with self._lock:
+            self._tokens = min(self._tokens, -seconds * self.fill_rate)
+            self._updated = time.monotonic()
+
+
+# Shared by every sendMessage in the process; a little under Telegram's 30/s
+TELEGRAM_BUCKET = TokenBucket(rate=25, per=1.0)
+
+
+def _back_off(response) -> None:
+    """Pause TELEGRAM_BUCKET for a 429's parameters.retry_after (1s if missing)."""
+    try:
+        retry_after = float(response.json().get("parameters", {}).get("retry_after", 1))
+    except ValueError:
+        retry_after = 1.0
+    logger.warning("⏳ Telegram rate limit hit; retrying after %gs", retry_after)
+    TELEGRAM_BUCKET.pause(retry_after)
+
+
+def post_telegram(session, url: str, **kwargs):
+    """POST to the Bot API through TELEGRAM_BUCKET.
+
+    On 429 the bucket is paused for the server's retry_after and the request
+    is retried once; the last response is returned either way.
+    """
+    TELEGRAM_BUCKET.acquire()
+    response = session.post(url, **kwargs)
+    if response.status_code == 429:
+        _back_off(response)
+        TELEGRAM_BUCKET.acquire()
+        response = session.post(url, **kwargs)
+    return response
+
+
+async def post_telegram_async(client, url: str, **kwargs):
+    """post_telegram for an httpx.AsyncClient."""
+    await TELEGRAM_BUCKET.acquire_async()
+    response = await client.post(url, **kwargs)
+    if response.status_code == 429:
+        _back_off(response)
+        await TELEGRAM_BUCKET.acquire_async()
+        response = await client.post(url, **kwargs)
+    return response
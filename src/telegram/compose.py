@@ -2,7 +2,7 @@
 import os
 import sys
 import pathlib
-from typing import Dict, List
+from typing import Dict
 
 # Add project root to path
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
@@ -1,8 +1,7 @@
 """FastAPI webhook app for Gmail push notifications."""
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, Request
 from base64 import b64decode
 import json
-import os
 import sys
 import pathlib
 
@@ -1,10 +1,14 @@
 """Service functions for processing Gmail webhook data."""
 import os
 import sys
+import asyncio
 import pathlib
-import requests
 import json
-from typing import Dict, Any
+import base64
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from html import escape
+from typing import Dict, Any, List, Optional, Tuple
 from dotenv import load_dotenv
 
 # Load environment secrets
@@ -17,16 +21,9 @@ sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
 
 from services.email.email_repo import EmailRepo
 from repo.push_repo import PushRepo
-from providers.gmail_helpers import build_service, gmail_history_list, gmail_fetch_message_by_id
-
-# Import Telegram digest system for proper notifications
-try:
-    from telegram import Bot
-    from interfaces.telegram.views.digest import send_digest
-    TELEGRAM_AVAILABLE = True
-except ImportError as e:
-    print(f"Warning: Telegram digest not available: {e}")
-    TELEGRAM_AVAILABLE = False
+from providers.gmail_helpers import build_service, gmail_history_list, gmail_fetch_messages_batch
+from shared.http_session import make_session
+from shared.rate_limit import post_telegram, post_telegram_async
 
 # Load environment configuration
 GMAIL_TOKEN_PATH = os.getenv("GMAIL_TOKEN_PATH", "config/gmail_token.json")
@@ -36,77 +33,209 @@ TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 repo = EmailRepo()
 push = PushRepo()
 
+# sendMessage rejects longer texts; digests are split so each message fits
+TELEGRAM_TEXT_LIMIT = 4096
+# Emails per digest message (4 buttons each; Telegram caps inline keyboards at 100 buttons)
+DIGEST_MAX_ROWS = 20
+
+
+@lru_cache(maxsize=1)
+def _digest_builder():
+    """Telegram digest builder, imported on the first notification rather than at
+    webhook startup (python-telegram-bot is a heavy import); None if unavailable"""
+    try:
+        from interfaces.telegram.views.digest import build_digest
+        return build_digest
+    except ImportError as e:
+        print(f"Warning: Telegram digest not available: {e}")
+        return None
+
+# Keep-alive connection to api.telegram.org shared by every send below
+_SESSION = make_session()
 
-def send_telegram_digest(email_id: int) -> None:
-    """Send a proper digest notification for a new email"""
-    if not TELEGRAM_AVAILABLE or not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
+
+def send_telegram_digest(email_id: int) -> bool:
+    """Send a proper digest notification for a new email; True if Telegram accepted it"""
+    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID or _digest_builder() is None:
         print("Telegram digest not available; skipping notification.")
-        return
-    
+        return False
+
     try:
         # Get the email details for digest format
         email_detail = repo.get_email_detail(email_id)
-        if not email_detail:
-            print(f"No email found with ID {email_id} for digest")
-            return
-        
-        # Convert to the tuple format expected by send_digest
-        # (email_id, provider, from_display, from_email, subject, snippet, received_at)
-        digest_row = (
-            email_id,
-            email_detail['provider'],
-            email_detail['from_display'],
-            email_detail['from_email'],
-            email_detail['subject'],
-            email_detail['snippet'],
-            email_detail['received_at']
-        )
-        
-        # Build digest using the proper function but send using HTTP API to avoid async issues
-        from interfaces.telegram.views.digest import build_digest
-        text, markup, mode = build_digest([digest_row])
-        
-        # Send using HTTP API instead of Bot object to avoid async issues
-        import json
-        import requests
-        
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-        
-        # Convert InlineKeyboardMarkup to dict format for JSON
-        keyboard_data = []
-        for row in markup.inline_keyboard:
-            button_row = []
-            for button in row:
-                button_row.append({
-                    "text": button.text,
-                    "callback_data": button.callback_data
-                })
-            keyboard_data.append(button_row)
-        
-        payload = {
-            "chat_id": TELEGRAM_CHAT_ID,
-            "text": text,
-            "parse_mode": "Markdown",
-            "reply_markup": {
-                "inline_keyboard": keyboard_data
-            }
+    except Exception as e:
+        print(f"❌ Failed to send Telegram digest: {e}")
+        return False
+    if not email_detail:
+        print(f"No email found with ID {email_id} for digest")
+        return False
+
+    # Convert to the tuple format expected by send_digest
+    # (email_id, provider, from_display, from_email, subject, snippet, received_at)
+    return bool(send_telegram_digest_rows([(
+        email_id,
+        email_detail['provider'],
+        email_detail['from_display'],
+        email_detail['from_email'],
+        email_detail['subject'],
+        email_detail['snippet'],
+        email_detail['received_at']
+    )]))
+
+
+def _digest_payload(rows: List[tuple]) -> Optional[Dict[str, Any]]:
+    """sendMessage JSON for a digest of rows, or None if Telegram isn't configured"""
+    build_digest = _digest_builder() if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID else None
+    if build_digest is None:
+        print("Telegram digest not available; skipping notification.")
+        return None
+
+    # Build digest using the proper function but send using HTTP API to avoid async issues
+    text, markup, mode = build_digest(rows)
+
+    # Convert InlineKeyboardMarkup to dict format for JSON
+    keyboard_data = [
+        [{"text": button.text, "callback_data": button.callback_data} for button in row]
+        for row in markup.inline_keyboard
+    ]
+
+    return {
+        "chat_id": TELEGRAM_CHAT_ID,
+        "text": text,
+        "parse_mode": mode,
+        "reply_markup": {
+            "inline_keyboard": keyboard_data
         }
-        
-        response = requests.post(url, json=payload, timeout=10)
-        
-        if response.status_code == 200:
-            print(f"✅ Telegram digest sent for email ID: {email_id}")
+    }
+
+
+def _digest_chunks(rows: List[tuple]) -> Optional[List[Tuple[List[tuple], Dict[str, Any]]]]:
+    """Split rows into (chunk, sendMessage payload) pairs that each fit Telegram's limits.
+
+    Chunks hold at most DIGEST_MAX_ROWS emails; one whose text still comes out
+    over TELEGRAM_TEXT_LIMIT (long subjects) is halved until it fits. None if
+    Telegram isn't configured.
+    """
+    pending = [rows[i:i + DIGEST_MAX_ROWS] for i in range(0, len(rows), DIGEST_MAX_ROWS)]
+    chunks = []
+    while pending:
+        chunk = pending.pop(0)
+        payload = _digest_payload(chunk)
+        if payload is None:
+            return None
+        if len(payload["text"]) > TELEGRAM_TEXT_LIMIT and len(chunk) > 1:
+            mid = len(chunk) // 2
+            pending[0:0] = [chunk[:mid], chunk[mid:]]
+            continue
+        chunks.append((chunk, payload))
+    return chunks
+
+
+def _digest_fallback(rows: List[tuple], error: Exception) -> None:
+    """Plain-text notification when the digest message couldn't be sent"""
+    print(f"❌ Failed to send Telegram digest: {error}")
+    try:
+        if len(rows) == 1:
+            send_telegram_simple(rows[0][0])
         else:
-            print(f"❌ Telegram API error: {response.status_code} - {response.text}")
-            raise Exception(f"HTTP {response.status_code}")
-        
+            send_telegram("📧 <b>New emails via webhook</b>\n" + "\n".join(
+                f"• {escape((r[3] or 'Unknown')[:200])}: {escape((r[4] or 'No Subject')[:200])}" for r in rows
+            ))
+    except Exception as e2:
+        print(f"❌ Fallback notification also failed: {e2}")
+
+
+def send_telegram_digest_rows(rows: List[tuple], fallback: bool = True) -> List[int]:
+    """Send digest messages covering every row; return the ids Telegram accepted.
+
+    rows: (email_id, provider, from_display, from_email, subject, snippet, received_at)
+
+    Rows go out in as many messages as Telegram's size limits require. Ids
+    of a message that was rejected are left out (they got the plain-text
+    fallback), so callers mark only what was really delivered as a digest.
+    Callers that retry pass fallback=False on all but their last attempt,
+    so a failing digest doesn't send a plain-text copy per attempt.
+    """
+    if not rows:
+        return []
+    try:
+        chunks = _digest_chunks(rows)
     except Exception as e:
-        print(f"❌ Failed to send Telegram digest: {e}")
-        # Fallback to simple notification
+        if fallback:
+            _digest_fallback(rows, e)
+        else:
+            print(f"❌ Failed to send Telegram digest: {e}")
+        return []
+    if chunks is None:
+        return []
+
+    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    sent: List[int] = []
+    for chunk, payload in chunks:
+        try:
+            response = post_telegram(_SESSION, url, json=payload, timeout=10)
+            if response.status_code != 200:
+                print(f"❌ Telegram API error: {response.status_code} - {response.text}")
+                raise Exception(f"HTTP {response.status_code}")
+            sent.extend(r[0] for r in chunk)
+            print(f"✅ Telegram digest sent for {len(chunk)} email(s)")
+        except Exception as e:
+            if fallback:
+                _digest_fallback(chunk, e)
+            else:
+                print(f"❌ Failed to send Telegram digest: {e}")
+    return sent
+
+
+_TG_CLIENT = None
+
+
+def _telegram_client():
+    """Shared httpx.AsyncClient for the Bot API (HTTP/2 when the h2 package is installed)"""
+    global _TG_CLIENT
+    if _TG_CLIENT is None or _TG_CLIENT.is_closed:
+        import httpx
         try:
-            send_telegram_simple(email_id)
-        except Exception as e2:
-            print(f"❌ Fallback notification also failed: {e2}")
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+        _TG_CLIENT = httpx.AsyncClient(
+            http2=http2,
+            base_url="https://api.telegram.org",
+            timeout=15.0,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+        )
+    return _TG_CLIENT
+
+
+async def send_telegram_digest_rows_async(rows: List[tuple]) -> List[int]:
+    """send_telegram_digest_rows for coroutines (the webhook handler): the
+    Bot API round-trips are awaited instead of blocking the event loop"""
+    if not rows:
+        return []
+    try:
+        chunks = _digest_chunks(rows)
+    except Exception as e:
+        await asyncio.to_thread(_digest_fallback, rows, e)
+        return []
+    if chunks is None:
+        return []
+
+    sent: List[int] = []
+    for chunk, payload in chunks:
+        try:
+            response = await post_telegram_async(
+                _telegram_client(), f"/bot{TELEGRAM_BOT_TOKEN}/sendMessage", json=payload
+            )
+            if response.status_code != 200:
+                print(f"❌ Telegram API error: {response.status_code} - {response.text}")
+                raise Exception(f"HTTP {response.status_code}")
+            sent.extend(r[0] for r in chunk)
+            print(f"✅ Telegram digest sent for {len(chunk)} email(s)")
+        except Exception as e:
+            await asyncio.to_thread(_digest_fallback, chunk, e)
+    return sent
 
 
 def send_telegram_simple(email_id: int) -> None:
@@ -121,19 +250,19 @@ def send_telegram_simple(email_id: int) -> None:
             return
             
         text = (
-            f"📧 *GMAIL* — New email via webhook\n"
-            f"From: {email.get('from_email', 'Unknown')}\n"
-            f"Subject: {email.get('subject', 'No Subject')}\n"
-            f"Date: {email.get('received_at', '')}"
+            f"📧 <b>GMAIL</b> — New email via webhook\n"
+            f"From: {escape(email.get('from_email') or 'Unknown')}\n"
+            f"Subject: {escape(email.get('subject') or 'No Subject')}\n"
+            f"Date: {email.get('received_at') or ''}"
         )
         
         url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
         payload = {
             "chat_id": TELEGRAM_CHAT_ID,
             "text": text,
-            "parse_mode": "Markdown"
+            "parse_mode": "HTML"
         }
-        requests.post(url, data=payload, timeout=10)
+        post_telegram(_SESSION, url, data=payload, timeout=10)
         
     except Exception as e:
         print(f"❌ Simple notification failed: {e}")
@@ -149,11 +278,20 @@ def send_telegram(text: str) -> None:
         url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
         payload = {
             "chat_id": TELEGRAM_CHAT_ID,
-            "text": text[:4000],  # Telegram max is larger; keep it tidy
+            "text": text,
             "disable_web_page_preview": True,
-            "parse_mode": "Markdown"  # Enable markdown formatting
+            "parse_mode": "HTML"  # callers escape dynamic text with html.escape
         }
-        r = requests.post(url, data=payload, timeout=15)
+        if len(text) > TELEGRAM_TEXT_LIMIT:
+            # Cut at a line break so no tag is split (callers keep tags within a line);
+            # with no line break to cut at, send it unparsed rather than as broken HTML
+            cut = text.rfind("\n", 0, TELEGRAM_TEXT_LIMIT - 2)
+            if cut > 0:
+                payload["text"] = text[:cut] + "\n…"
+            else:
+                payload["text"] = text[:TELEGRAM_TEXT_LIMIT - 1] + "…"
+                del payload["parse_mode"]
+        r = post_telegram(_SESSION, url, data=payload, timeout=15)
         r.raise_for_status()
         print(f"✅ Telegram notification sent: {text[:50]}...")
     except Exception as e:
@@ -167,21 +305,17 @@ def format_telegram_message(nm: Dict[str, Any]) -> str:
     date = nm.get("received_at") or ""
     snippet = nm.get("snippet") or ""
     
-    # Escape markdown special characters in email data
-    frm = frm.replace("_", "\\_").replace("*", "\\*").replace("`", "\\`")
-    subj = subj.replace("_", "\\_").replace("*", "\\*").replace("`", "\\`")
-    snippet = snippet.replace("_", "\\_").replace("*", "\\*").replace("`", "\\`")
-    
-    # Truncate snippet if too long
+    # Truncate snippet if too long (before escaping, so no entity gets cut in half)
     if len(snippet) > 200:
         snippet = snippet[:197] + "…"
     
+    # HTML parse mode: only &, < and > need escaping
     return (
-        f"📧 *GMAIL* — New email via webhook\n"
-        f"From: {frm}\n"
-        f"Subject: {subj}\n"
+        f"📧 <b>GMAIL</b> — New email via webhook\n"
+        f"From: {escape(frm)}\n"
+        f"Subject: {escape(subj)}\n"
         f"Date: {date}\n"
-        f"Preview: {snippet}\n\n"
+        f"Preview: {escape(snippet)}\n\n"
         f"🧵 Thread ID: {nm.get('thread_id')}"
     )
 
@@ -194,6 +328,19 @@ def _load_creds():
     ])
 
 
+@lru_cache(maxsize=4096)
+def _parse_header_date(value: str):
+    """RFC 2822 Date header -> datetime, or None if it doesn't parse.
+
+    Memoized: the same header string comes back on history replays and
+    retried webhook deliveries.
+    """
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
 def to_normalized_gmail(gmail_msg: Dict[str, Any]) -> Dict[str, Any]:
     """
     Convert Gmail message to normalized format.
@@ -225,12 +372,10 @@ def to_normalized_gmail(gmail_msg: Dict[str, Any]) -> Dict[str, Any]:
         if part.get("mimeType") == "text/plain":
             data = part.get("body", {}).get("data", "")
             if data:
-                import base64
                 body_text = base64.urlsafe_b64decode(data + "===").decode("utf-8", errors="ignore")
         elif part.get("mimeType") == "text/html":
             data = part.get("body", {}).get("data", "")
             if data:
-                import base64
                 body_html = base64.urlsafe_b64decode(data + "===").decode("utf-8", errors="ignore")
         
         for subpart in part.get("parts", []):
@@ -239,14 +384,7 @@ def to_normalized_gmail(gmail_msg: Dict[str, Any]) -> Dict[str, Any]:
     extract_body(payload)
     
     # Parse date
-    from datetime import datetime
-    received_at = None
-    if "date" in headers:
-        try:
-            from email.utils import parsedate_to_datetime
-            received_at = parsedate_to_datetime(headers["date"])
-        except:
-            pass
+    received_at = _parse_header_date(headers["date"]) if "date" in headers else None
     
     # Extract thread ID with validation and fallback
     thread_id = gmail_msg.get("threadId")
@@ -274,6 +412,32 @@ def to_normalized_gmail(gmail_msg: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def _email_row(nm: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalized Gmail message -> EmailRepo.upsert_email_many row.
+
+    Built once per message while fetching; the digest rows read the same
+    dict, so the raw normalized message isn't probed again.
+    """
+    return {
+        "provider": nm["provider"],
+        "provider_message_id": nm["id"],
+        "provider_thread_id": nm["thread_id"],
+        "from_display": nm.get("from_name"),
+        "from_email": nm.get("from_email"),
+        "to_emails": nm.get("to_emails", []),
+        "cc_emails": nm.get("cc_emails", []),
+        "bcc_emails": nm.get("bcc_emails", []),
+        "subject": nm.get("subject"),
+        "snippet": nm.get("snippet"),
+        "body_plain": nm.get("body_text"),
+        "body_html": nm.get("body_html"),
+        "received_at": nm.get("received_at"),
+        "tags": [],
+        "internet_message_id": nm.get("internet_message_id"),
+        "references_ids": nm.get("references_ids", []),
+    }
+
+
 async def gmail_process_history(incoming_hid: int):
     """
     Process Gmail history changes from webhook notification.
@@ -297,74 +461,66 @@ async def gmail_process_history(incoming_hid: int):
         
         print(f"📨 Found {len(history_items)} history items to process")
         
-        # Process each history item
-        new_emails_count = 0
+        # Collect every new message first; fetching, storing and notifying
+        # happen once for the whole batch instead of per message
+        new_ids = []
+        seen_ids = set()
         for hist_item in history_items:
             for added in hist_item.get("messagesAdded", []):
                 msg_id = added["message"]["id"]
+                if msg_id in seen_ids:
+                    continue
+                seen_ids.add(msg_id)
                 
                 # Check if we already have this message
                 existing_id = repo.get_email_id("gmail", msg_id)
                 if existing_id:
                     print(f"⏭️ Skipping existing email: {msg_id}")
                     continue
+                new_ids.append(msg_id)
+
+        # Fetch full messages with batched requests instead of one round-trip each
+        full_msgs = gmail_fetch_messages_batch(svc, new_ids) if new_ids else {}
+        new_rows = []
+        for msg_id in new_ids:
+            full_msg = full_msgs.get(msg_id)
+            if full_msg is None:
+                continue
+            try:
+                nm = to_normalized_gmail(full_msg)
+                
+                # Validate thread ID is not empty
+                if not nm['thread_id'] or nm['thread_id'].strip() == "":
+                    print(f"❌ Error: Empty thread ID for message {msg_id}, skipping...")
+                    continue
                 
-                try:
-                    # Fetch full message
-                    full_msg = gmail_fetch_message_by_id(svc, msg_id)
-                    nm = to_normalized_gmail(full_msg)
-                    
-                    # Debug: Log the extracted threadId
-                    print(f"🐛 Debug - Message {msg_id}: threadId='{nm['thread_id']}', subject='{nm.get('subject', 'No Subject')}'")
-                    
-                    # Validate thread ID is not empty
-                    if not nm['thread_id'] or nm['thread_id'].strip() == "":
-                        print(f"❌ Error: Empty thread ID for message {msg_id}, skipping...")
-                        continue
-                    
-                    # Store in database
-                    email_id = repo.upsert_email(
-                        provider=nm["provider"],
-                        provider_message_id=nm["id"],
-                        provider_thread_id=nm["thread_id"],
-                        from_display=nm.get("from_name"),
-                        from_email=nm.get("from_email"),
-                        to_emails=nm.get("to_emails", []),
-                        cc_emails=nm.get("cc_emails", []),
-                        bcc_emails=nm.get("bcc_emails", []),
-                        subject=nm.get("subject"),
-                        snippet=nm.get("snippet"),
-                        body_plain=nm.get("body_text"),
-                        body_html=nm.get("body_html"),
-                        received_at=nm.get("received_at"),
-                        tags=[],
-                        internet_message_id=nm.get("internet_message_id"),
-                        references_ids=nm.get("references_ids", [])
-                    )
-                    
-                    new_emails_count += 1
-                    print(f"✅ Processed new email: {nm.get('subject', 'No Subject')} (ID: {email_id})")
-                    
-                    # Send proper Telegram digest notification for new email
-                    notification_sent = False
-                    try:
-                        send_telegram_digest(email_id)
-                        notification_sent = True
-                        print(f"✅ Telegram notification sent for email ID: {email_id}")
-                    except Exception as e:
-                        print(f"⚠️ Failed to send Telegram digest: {e}")
-                    
-                    # Always mark as notified to avoid infinite retries
-                    # (even if notification failed, we don't want to keep retrying in webhook)
-                    try:
-                        repo.mark_notified(email_id)
-                        status = "✅ notified" if notification_sent else "⚠️ marked (notification failed)"
-                        print(f"{status}: email ID {email_id}")
-                    except Exception as me:
-                        print(f"❌ Failed to mark email {email_id} as notified: {me}")
-                    
-                except Exception as e:
-                    print(f"❌ Error processing message {msg_id}: {e}")
+                new_rows.append(_email_row(nm))
+                
+            except Exception as e:
+                print(f"❌ Error processing message {msg_id}: {e}")
+
+        if new_rows:
+            # Store in database: one transaction for the whole batch
+            email_ids = repo.upsert_email_many(new_rows)
+            new_emails_count = len(email_ids)
+            print(f"✅ Stored {new_emails_count} new emails")
+
+            # Digest messages for the batch instead of one message per email
+            notified_ids = await send_telegram_digest_rows_async([
+                (email_id, r["provider"], r["from_display"], r["from_email"],
+                 r["subject"], r["snippet"], r["received_at"])
+                for email_id, r in zip(email_ids, new_rows)
+            ])
+
+            # Only emails whose digest Telegram accepted; the rest stay
+            # unnotified for the retry_notifications job
+            try:
+                repo.mark_notified_many(notified_ids)
+            except Exception as me:
+                print(f"❌ Failed to mark emails {notified_ids} as notified: {me}")
+            print(f"✅ notified: {len(notified_ids)} of {new_emails_count} emails")
+        else:
+            new_emails_count = 0
 
         # Update last processed history ID
         push.set_gmail_last_history_id(incoming_hid)
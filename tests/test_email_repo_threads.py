@@ -0,0 +1,79 @@
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+
+pytest.importorskip('psycopg')
+
+from services.email.email_repo import EmailRepo
+
+
+class FakeThreadCursor:
+    """Answers _upsert_threads' three statements from an in-memory email_threads table"""
+
+    def __init__(self, rows=()):
+        # (provider, provider_thread_id) -> [id, subject_last]
+        self.table = {(p, t): [i, s] for p, t, i, s in rows}
+        self.next_id = 100
+        self.statements = []
+        self._result = []
+
+    def execute(self, sql, params=None, **kwargs):
+        self.statements.append(sql.split()[0])
+        if sql.lstrip().startswith("SELECT"):
+            wanted = set(zip(params[0], params[1]))
+            self._result = [(p, t, i, s) for (p, t), (i, s) in self.table.items() if (p, t) in wanted]
+        elif sql.lstrip().startswith("INSERT"):
+            self._result = []
+            for p, t, s in zip(*params):
+                if (p, t) not in self.table:
+                    self.table[(p, t)] = [self.next_id, s]
+                    self.next_id += 1
+                self._result.append((p, t, self.table[(p, t)][0]))
+        elif sql.lstrip().startswith("UPDATE"):
+            by_id = {row[0]: row for row in self.table.values()}
+            for thread_id, subject in zip(*params):
+                by_id[thread_id][1] = subject
+            self._result = []
+
+    def fetchall(self):
+        return self._result
+
+
+def test_new_threads_inserted_once_and_ids_in_input_order():
+    cur = FakeThreadCursor()
+    ids = EmailRepo()._upsert_threads(cur, [
+        ("gmail", "t1", "Hello"),
+        ("gmail", "t2", "Other"),
+        ("gmail", "t1", "Re: Hello"),
+    ])
+    assert ids[0] == ids[2]
+    assert ids[0] != ids[1]
+    assert cur.statements == ["SELECT", "INSERT"]
+
+
+def test_existing_thread_subject_updated():
+    cur = FakeThreadCursor([("gmail", "t1", 7, "Hello")])
+    ids = EmailRepo()._upsert_threads(cur, [("gmail", "t1", "Re: Hello")])
+    assert ids == [7]
+    assert cur.statements == ["SELECT", "UPDATE"]
+    assert cur.table[("gmail", "t1")] == [7, "Re: Hello"]
+
+
+def test_unchanged_subject_costs_only_the_lookup():
+    cur = FakeThreadCursor([("gmail", "t1", 7, "Hello")])
+    assert EmailRepo()._upsert_threads(cur, [("gmail", "t1", "Hello")]) == [7]
+    assert cur.statements == ["SELECT"]
+
+
+def test_reused_thread_id_with_unrelated_subject_is_split_off():
+    cur = FakeThreadCursor([("outlook", "t1", 7, "Quarterly report")])
+    ids = EmailRepo()._upsert_threads(cur, [("outlook", "t1", "Lunch on Friday?")])
+    assert ids[0] != 7
+    new_keys = [key for key in cur.table if key != ("outlook", "t1")]
+    assert len(new_keys) == 1 and new_keys[0][1].startswith("t1_")
+    # The original thread keeps its subject
+    assert cur.table[("outlook", "t1")] == [7, "Quarterly report"]
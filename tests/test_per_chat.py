@@ -0,0 +1,93 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+
+pytest.importorskip('telegram')
+
+from telegram import Chat, Message, Update
+
+from interfaces.telegram.per_chat import PerChatUpdateProcessor
+
+
+def _update(update_id, chat_id):
+    chat = Chat(id=chat_id, type=Chat.PRIVATE)
+    message = Message(message_id=update_id, date=None, chat=chat, text=str(update_id))
+    return Update(update_id=update_id, message=message)
+
+
+def test_same_chat_updates_run_in_order():
+    processor = PerChatUpdateProcessor()
+    events = []
+
+    async def handle(name, delay):
+        events.append(("start", name))
+        await asyncio.sleep(delay)
+        events.append(("end", name))
+
+    async def run():
+        # The slow first update must finish before the quick second one starts
+        await asyncio.gather(
+            processor.do_process_update(_update(1, 10), handle("a1", 0.05)),
+            processor.do_process_update(_update(2, 10), handle("a2", 0)),
+        )
+
+    asyncio.run(run())
+    assert events == [("start", "a1"), ("end", "a1"), ("start", "a2"), ("end", "a2")]
+
+
+def test_other_chats_are_not_blocked():
+    processor = PerChatUpdateProcessor()
+    finished = []
+
+    async def handle(name, delay):
+        await asyncio.sleep(delay)
+        finished.append(name)
+
+    async def run():
+        await asyncio.gather(
+            processor.do_process_update(_update(1, 10), handle("slow chat", 0.05)),
+            processor.do_process_update(_update(2, 20), handle("other chat", 0)),
+        )
+
+    asyncio.run(run())
+    assert finished == ["other chat", "slow chat"]
+
+
+def test_locks_are_dropped_when_idle():
+    processor = PerChatUpdateProcessor()
+
+    async def handle():
+        await asyncio.sleep(0)
+
+    async def failing():
+        raise RuntimeError("handler failed")
+
+    async def run():
+        await asyncio.gather(
+            processor.do_process_update(_update(1, 10), handle()),
+            processor.do_process_update(_update(2, 10), handle()),
+            processor.do_process_update(_update(3, 20), handle()),
+        )
+        with pytest.raises(RuntimeError):
+            await processor.do_process_update(_update(4, 30), failing())
+
+    asyncio.run(run())
+    assert dict(processor._locks) == {}
+    assert dict(processor._users) == {}
+
+
+def test_updates_without_chat_run_directly():
+    processor = PerChatUpdateProcessor()
+    ran = []
+
+    async def handle():
+        ran.append(True)
+
+    asyncio.run(processor.do_process_update(Update(update_id=1), handle()))
+    assert ran == [True]
+    assert dict(processor._locks) == {}
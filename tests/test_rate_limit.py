@@ -0,0 +1,174 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+
+from shared import rate_limit
+from shared.rate_limit import TokenBucket
+
+
+class FakeClock:
+    """Stands in for time.monotonic/time.sleep so bucket waits are instant and exact"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        if self._body is None:
+            raise ValueError("not JSON")
+        return self._body
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.posts = []
+
+    def post(self, url, **kwargs):
+        self.posts.append((url, kwargs))
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limit.time, "sleep", clock.sleep)
+    return clock
+
+
+@pytest.fixture
+def bucket(clock, monkeypatch):
+    """Fresh shared bucket for post_telegram, on the fake clock"""
+    bucket = TokenBucket(rate=2, per=1.0)
+    monkeypatch.setattr(rate_limit, "TELEGRAM_BUCKET", bucket)
+    return bucket
+
+
+def test_token_bucket_burst_then_waits(clock):
+    bucket = TokenBucket(rate=2, per=1.0)
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.sleeps == []
+
+    # Third call owes half a second at 2 tokens/s
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+
+def test_token_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate=2, per=1.0)
+    bucket.acquire()
+    bucket.acquire()
+
+    # A long idle period refills only to capacity, not beyond
+    clock.now += 60
+    for _ in range(2):
+        bucket.acquire()
+    assert clock.sleeps == []
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+
+def test_token_bucket_queues_concurrent_waiters(clock):
+    bucket = TokenBucket(rate=2, per=1.0)
+    waits = [bucket._reserve() for _ in range(4)]
+    assert waits == [0.0, 0.0, pytest.approx(0.5), pytest.approx(1.0)]
+
+
+def test_token_bucket_pause(clock):
+    bucket = TokenBucket(rate=2, per=1.0)
+    bucket.pause(3)
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(3.5)]
+
+
+def test_acquire_async_waits_without_time_sleep(clock, monkeypatch):
+    slept = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", fake_sleep)
+    bucket = TokenBucket(rate=1, per=1.0)
+
+    async def run():
+        await bucket.acquire_async()
+        await bucket.acquire_async()
+
+    asyncio.run(run())
+    assert slept == [pytest.approx(1.0)]
+    assert clock.sleeps == []
+
+
+def test_post_telegram_retries_once_after_retry_after(bucket, clock):
+    session = FakeSession(
+        FakeResponse(429, {"ok": False, "parameters": {"retry_after": 3}}),
+        FakeResponse(200, {"ok": True}),
+    )
+    response = rate_limit.post_telegram(session, "https://api.telegram.org/botX/sendMessage", json={"text": "hi"})
+
+    assert response.status_code == 200
+    assert len(session.posts) == 2
+    assert session.posts[1][1] == {"json": {"text": "hi"}}
+    # The retry waited out the server's retry_after (plus its own token at 2/s)
+    assert clock.sleeps == [pytest.approx(3.5)]
+
+
+def test_post_telegram_gives_up_after_second_429(bucket, clock):
+    session = FakeSession(
+        FakeResponse(429, {"parameters": {"retry_after": 1}}),
+        FakeResponse(429, {"parameters": {"retry_after": 1}}),
+    )
+    response = rate_limit.post_telegram(session, "url")
+    assert response.status_code == 429
+    assert len(session.posts) == 2
+
+
+@pytest.mark.parametrize("body", [None, {"ok": False}])
+def test_back_off_defaults_to_one_second(bucket, clock, body):
+    rate_limit._back_off(FakeResponse(429, body))
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(1.5)]
+
+
+def test_post_telegram_async_retries_after_429(bucket, clock, monkeypatch):
+    slept = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", fake_sleep)
+
+    class FakeClient(FakeSession):
+        async def post(self, url, **kwargs):
+            return FakeSession.post(self, url, **kwargs)
+
+    client = FakeClient(
+        FakeResponse(429, {"parameters": {"retry_after": 2}}),
+        FakeResponse(200, {"ok": True}),
+    )
+    response = asyncio.run(rate_limit.post_telegram_async(client, "/botX/sendMessage", json={}))
+
+    assert response.status_code == 200
+    assert len(client.posts) == 2
+    assert slept == [pytest.approx(2.5)]
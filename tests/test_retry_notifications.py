@@ -0,0 +1,63 @@
+import os
+import random
+import sys
+
+import pytest
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+
+pytest.importorskip('psycopg')
+pytest.importorskip('dotenv')
+
+from jobs import retry_notifications
+
+ROW = (42, "gmail", "Alice", "alice@example.com", "Subject", "snippet", None)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(retry_notifications.time, "sleep", sleeps.append)
+    monkeypatch.setattr(retry_notifications, "RNG", random.Random(0))
+    return sleeps
+
+
+def _sender(monkeypatch, outcomes):
+    """Replace the digest send with one that plays back outcomes (ids list or exception)"""
+    calls = []
+
+    def send(rows, fallback=True):
+        calls.append((rows, fallback))
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(retry_notifications, "send_telegram_digest_rows", send)
+    return calls
+
+
+def test_first_success_returns_without_sleeping(monkeypatch, sleeps):
+    calls = _sender(monkeypatch, [[42]])
+    assert retry_notifications._send_with_backoff(ROW) is True
+    assert calls == [([ROW], False)]
+    assert sleeps == []
+
+
+def test_retries_failures_with_capped_jittered_delays(monkeypatch, sleeps):
+    _sender(monkeypatch, [ConnectionError("reset"), [], [42]])
+    assert retry_notifications._send_with_backoff(ROW, base=0.5, cap=30.0) is True
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.5
+    assert 0 <= sleeps[1] <= 1.0
+
+
+def test_gives_up_after_max_attempts(monkeypatch, sleeps):
+    calls = _sender(monkeypatch, [[]] * 3)
+    assert retry_notifications._send_with_backoff(ROW, base=10, cap=1.0, max_attempts=3) is False
+    # Only the last attempt may send the plain-text fallback
+    assert [fallback for _rows, fallback in calls] == [False, False, True]
+    # No sleep after the last attempt, and none longer than the cap
+    assert len(sleeps) == 2
+    assert all(0 <= s <= 1.0 for s in sleeps)